@@ -11,12 +11,14 @@ def create_app(config_name: str = "development") -> Flask:
     """Flask uygulamasını oluşturan fabrika fonksiyonu."""
     app = Flask(__name__)
     app.config.from_object(config_map[config_name])
+    # Arka plan planlama süreçleri uygulamayı aynı ayarlarla yeniden kurar (bkz. jobs.py)
+    app.config["CONFIG_NAME"] = config_name
 
     db.init_app(app)
     migrate.init_app(app, db)
 
     # Modellerin importu (db.create_all için gerekli)
-    from models import Course, Classroom, User, Exam, InstructorAvailability  # noqa: F401
+    from models import Course, Classroom, User, Exam, InstructorAvailability, SchedulerJob, ScheduleVersion  # noqa: F401
 
     # Blueprint kayıtları
     from routes import main_bp
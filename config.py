@@ -17,6 +17,20 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Sınav planlayıcı: sıradaki dersi seçme stratejisi (student_count, degree, dsatur, domain)
+    SCHEDULER_ORDERING = os.environ.get("SCHEDULER_ORDERING", "domain")
+    # Sınav planlayıcı: arama süresi sınırı (saniye); dolunca en iyi kısmi program kaydedilir
+    SCHEDULER_TIME_LIMIT = float(os.environ.get("SCHEDULER_TIME_LIMIT", "60"))
+    # Sınav planlayıcı: derslik kullanımını yerel arama ile iyileştirme süresi (saniye, 0 = kapalı)
+    SCHEDULER_IMPROVE_TIME = float(os.environ.get("SCHEDULER_IMPROVE_TIME", "10"))
+    # Sınav planlayıcı: paralel portföy süreç sayısı (1 = tek süreçte sıralı çözüm)
+    SCHEDULER_WORKERS = int(os.environ.get("SCHEDULER_WORKERS", "1"))
+    # Sınav planlayıcı: bağımsız ders gruplarını ayrı süreçlerde çöz (öncelik portföy modundan yüksek)
+    SCHEDULER_DECOMPOSE = os.environ.get("SCHEDULER_DECOMPOSE", "false").lower() == "true"
+    # Sınav planlayıcı: /admin/run_scheduler aramayı istek içinde değil arka plan sürecinde çalıştırsın
+    # (durum /admin/scheduler_jobs/<id> üzerinden izlenir)
+    SCHEDULER_BACKGROUND = os.environ.get("SCHEDULER_BACKGROUND", "false").lower() == "true"
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -0,0 +1,259 @@
+"""
+Bileşenlere Ayrıştırarak Sınav Planlama
+
+Ortak öğrencisi ve ortak hocası olmayan dersler birbirini yalnızca derslik kapasitesi
+üzerinden etkiler. Bu modül dersleri bu ilişkilerin bağlı bileşenlerine ayırır, bileşenleri
+yük olarak dengeli parçalarda toplar ve her parçaya dersliklerin bir bölümünü önceden ayırır.
+Parçalar ayrı süreçlerde bağımsız çözülür; bir bölümdeki geri dönüşler ilgisiz bir fakülteyi
+yeniden aratmaz. Sonuçlar birleştirilir; ayrılan derslikler yetmediği için yerleşemeyen
+dersler, birleşik doluluk üzerinde tüm dersliklerle sıralı olarak yeniden çözülür.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import replace
+from datetime import date
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Set
+
+from models import Course, Classroom
+from scheduler import AdvancedScheduler, ExamAssignment, ScheduleResult, SchedulingSnapshot, build_snapshot
+
+# Parçaların sonuçlarında toplanarak birleştirilen sayaçlar
+SUMMED_STATISTICS = ('nodes', 'backtracks', 'domain_wipeouts', 'backjumps')
+# Parçalar beklenirken dış iptal isteğinin (should_stop) kontrol aralığı (saniye)
+STOP_POLL_SECONDS = 0.5
+
+# Alt süreçte, ana sürecin iptal sinyali (initializer ile atanır)
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _conflict_components(scheduler: AdvancedScheduler, courses: List[Course]) -> List[List[Course]]:
+    """Ortak öğrenci (çakışma grafı) veya ortak hoca ile bağlı ders grupları (birleşim-bul)"""
+    parent = {c.id: c.id for c in courses}
+
+    def find(course_id):
+        while parent[course_id] != course_id:
+            parent[course_id] = parent[parent[course_id]]
+            course_id = parent[course_id]
+        return course_id
+
+    def union(course1_id, course2_id):
+        root1, root2 = find(course1_id), find(course2_id)
+        if root1 != root2:
+            parent[root2] = root1
+
+    first_course_of_instructor = {}
+    for course in courses:
+        for neighbor_id in scheduler.course_conflict_graph.get(course.id, {}):
+            if neighbor_id in parent:
+                union(course.id, neighbor_id)
+        other_id = first_course_of_instructor.setdefault(course.instructor, course.id)
+        union(course.id, other_id)
+
+    components = {}
+    for course in courses:
+        components.setdefault(find(course.id), []).append(course)
+    return list(components.values())
+
+
+def _course_demand(courses: List[Course]) -> int:
+    """Koltuk x dakika cinsinden derslik talebi"""
+    return sum(c.student_count * c.exam_duration for c in courses)
+
+
+def _group_components(components: List[List[Course]], part_count: int) -> List[List[Course]]:
+    """Bileşenleri talebe göre dengeli parçalara topla (en büyük önce, en az yüklü parçaya)"""
+    parts: List[List[Course]] = [[] for _ in range(part_count)]
+    loads = [0] * part_count
+    for component in sorted(components, key=_course_demand, reverse=True):
+        target = loads.index(min(loads))
+        parts[target].extend(component)
+        loads[target] += _course_demand(component)
+    return [part for part in parts if part]
+
+
+def _partition_classrooms(parts: List[List[Course]], classrooms: List[Classroom]) -> List[List[Classroom]]:
+    """
+    Derslikleri parçalara ayır (büyükten küçüğe, her seferinde en çok ihtiyacı olan parçaya):
+    önce en büyük dersi henüz sığmayan parçalar, sonra lab bekleyen parçalar,
+    sonra koltuk başına talebi en yüksek parça
+    """
+    demands = [_course_demand(part) for part in parts]
+    largest = [max(c.student_count for c in part) for part in parts]
+    wants_lab = [any(c.requires_special_room for c in part) for part in parts]
+    allocation: List[List[Classroom]] = [[] for _ in parts]
+    capacities = [0] * len(parts)
+    has_lab = [False] * len(parts)
+
+    for classroom in sorted(classrooms, key=lambda cl: cl.capacity, reverse=True):
+        is_lab = bool(classroom.room_type and 'lab' in classroom.room_type.lower())
+
+        def priority(i):
+            return (
+                capacities[i] < largest[i],
+                is_lab and wants_lab[i] and not has_lab[i],
+                demands[i] / (capacities[i] + 1),
+            )
+
+        target = max(range(len(parts)), key=priority)
+        allocation[target].append(classroom)
+        capacities[target] += classroom.capacity
+        has_lab[target] = has_lab[target] or is_lab
+
+    return allocation
+
+
+def _part_snapshot(snapshot: SchedulingSnapshot, courses: List[Course], classrooms: List[Classroom],
+                   fixed_course_ids: Set[int]) -> SchedulingSnapshot:
+    """
+    Parçanın dersleri ve derslikleriyle sınırlı girdi kopyası
+    Sabit sınavların kayıtları da tutulur (parçanın dersleriyle öğrenci çakışmaları için)
+    """
+    course_ids = {c.id for c in courses} | fixed_course_ids
+    classroom_ids = {cl.id for cl in classrooms}
+    return replace(
+        snapshot,
+        courses=tuple(courses),
+        classrooms=tuple(classrooms),
+        enrollments=tuple(row for row in snapshot.enrollments if row[0] in course_ids),
+        proximities=tuple(row for row in snapshot.proximities
+                          if row[0] in classroom_ids and row[1] in classroom_ids)
+    )
+
+
+def _solve_part(snapshot: SchedulingSnapshot, days: int, start_date: date, ordering: str,
+                time_limit: Optional[float], improve_time: Optional[float],
+                fixed_assignments: List[ExamAssignment]) -> ScheduleResult:
+    """Alt süreçte tek bir parçayı kendi derslikleriyle çöz"""
+    scheduler = AdvancedScheduler(snapshot=snapshot)
+    return scheduler.generate_exam_schedule(
+        list(snapshot.courses), list(snapshot.classrooms), days, start_date, ordering,
+        time_limit=time_limit, improve_time=improve_time, fixed_assignments=fixed_assignments,
+        should_stop=_stop_event.is_set if _stop_event is not None else None
+    )
+
+
+def generate_exam_schedule_decomposed(courses: List[Course], classrooms: List[Classroom],
+                                      days: int = 7, start_date: Optional[date] = None,
+                                      ordering: str = "student_count", workers: Optional[int] = None,
+                                      time_limit: Optional[float] = None,
+                                      improve_time: Optional[float] = None,
+                                      fixed_assignments: Optional[List[ExamAssignment]] = None,
+                                      snapshot: Optional[SchedulingSnapshot] = None,
+                                      should_stop: Optional[Callable[[], bool]] = None) -> ScheduleResult:
+    """
+    Bağımsız ders gruplarını ayrı süreçlerde, ayrılmış dersliklerle çöz ve birleştir
+    workers: en fazla parça / süreç sayısı (varsayılan: işlemci sayısı)
+    time_limit: her parçanın ve gerekirse son sıralı çözümün arama süresi sınırı (saniye)
+    fixed_assignments: sabit sınavlar; her parçaya ve son sıralı çözüme sabit olarak verilir
+    snapshot: önceden alınmış girdi kopyası (verilmezse courses / classrooms için alınır)
+    should_stop: ara ara çağrılır, True dönerse parçalar en iyi kısmi sonuçlarıyla durdurulur
+    """
+    started = perf_counter()
+    if start_date is None:
+        start_date = date.today()
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if snapshot is None:
+        snapshot = build_snapshot(courses, classrooms)
+    scheduler = AdvancedScheduler(snapshot=snapshot)
+    scheduler._build_student_course_cache()
+    scheduler._build_conflict_graph()
+
+    fixed_assignments = fixed_assignments or []
+    fixed_course_ids = {a.course_id for a in fixed_assignments}
+    target_courses = [c for c in snapshot.courses if c.has_exam and c.id not in fixed_course_ids]
+    if not target_courses:
+        return ScheduleResult(success=False, message="Planlanacak ders bulunamadı.", exams=[], statistics={})
+    components = _conflict_components(scheduler, target_courses)
+    part_count = min(workers, len(components), len(snapshot.classrooms))
+    print(f"DECOMPOSITION: {len(target_courses)} ders, {len(components)} bağımsız bileşen, {part_count} parça")
+
+    results: List[ScheduleResult] = []
+    part_sizes = []
+    exams = []
+    if part_count > 1:
+        parts = _group_components(components, part_count)
+        room_parts = _partition_classrooms(parts, list(snapshot.classrooms))
+        part_sizes = [(len(part), len(rooms)) for part, rooms in zip(parts, room_parts)]
+        stop_event = multiprocessing.Event()
+        with ProcessPoolExecutor(max_workers=len(parts), initializer=_init_worker,
+                                 initargs=(stop_event,)) as executor:
+            futures = [
+                executor.submit(_solve_part, _part_snapshot(snapshot, part, rooms, fixed_course_ids), days,
+                                start_date, ordering, time_limit, improve_time, fixed_assignments)
+                for part, rooms in zip(parts, room_parts)
+            ]
+            pending = set(futures)
+            while pending:
+                if should_stop is not None and not stop_event.is_set() and should_stop():
+                    print("DECOMPOSITION: İptal istendi, parçalar durduruluyor")
+                    stop_event.set()
+                _, pending = wait(pending, timeout=STOP_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            results = [future.result() for future in futures]
+        for result in results:
+            exams.extend(result.exams)
+
+    # Ayrılan derslikler yetmeyen (veya ayrıştırılamayan) dersler: birleşik doluluk üzerinde,
+    # tüm dersliklerle sıralı çözüm; parçaların sınavları sabit kabul edilir
+    placed_ids = {exam.course_id for exam in exams}
+    fallback_courses = [c for c in target_courses if c.id not in placed_ids]
+    if fallback_courses and not (should_stop is not None and should_stop()):
+        if part_count > 1:
+            print(f"DECOMPOSITION: {len(fallback_courses)} ders tüm dersliklerle yeniden çözülüyor")
+        fallback = AdvancedScheduler(snapshot=snapshot).generate_exam_schedule(
+            list(snapshot.courses), list(snapshot.classrooms), days, start_date, ordering,
+            time_limit=time_limit, improve_time=improve_time, fixed_assignments=fixed_assignments + exams,
+            should_stop=should_stop
+        )
+        results.append(fallback)
+        exams = exams + fallback.exams
+
+    # Sonuçları birleştir
+    placed_ids = {exam.course_id for exam in exams}
+    failed_courses: Dict[str, int] = {}
+    for result in results:
+        for name, failures in result.statistics.get('failed_courses', {}).items():
+            failed_courses[name] = failed_courses.get(name, 0) + failures
+    statistics = {
+        'total_courses': len(target_courses),
+        'scheduled_courses': len(placed_ids),
+        'failed_courses': failed_courses,
+        'unscheduled_courses': [c.name for c in target_courses if c.id not in placed_ids],
+        'total_classrooms_used': len({exam.classroom_id for exam in exams}),
+        'average_classroom_utilization': 0,
+        'ordering': ordering,
+        'stopped_by': next((result.statistics['stopped_by'] for result in results
+                            if result.statistics.get('stopped_by')), None),
+        'elapsed_seconds': round(perf_counter() - started, 3),
+        'failure_causes': {'student_conflict': 0, 'classroom_capacity': 0, 'instructor_window': 0},
+        'decomposition': {
+            'components': len(components),
+            'parts': part_sizes,  # [(ders sayısı, derslik sayısı)]
+            'fallback_courses': len(fallback_courses) if part_count > 1 else 0,
+        },
+    }
+    for key in SUMMED_STATISTICS:
+        statistics[key] = sum(result.statistics.get(key, 0) for result in results)
+    for result in results:
+        for cause, count in result.statistics.get('failure_causes', {}).items():
+            statistics['failure_causes'][cause] += count
+
+    success = len(placed_ids) == len(target_courses)
+    if success:
+        message = f"Tüm dersler başarıyla planlandı! {len(exams)} sınav ataması yapıldı."
+    else:
+        message = (f"Kısmi başarı: {len(placed_ids)}/{len(target_courses)} ders planlandı. "
+                   f"{len(target_courses) - len(placed_ids)} ders planlanamadı.")
+
+    return ScheduleResult(success=success, message=message, exams=exams, statistics=statistics)
@@ -0,0 +1,172 @@
+"""
+Arama Öncesi Fizibilite Kontrolü
+
+Aşırı kısıtlı bir girdi, arama ancak tüm ağacı tükettikten sonra başarısız olur; bu
+saatler sürebilir. Bu modül arama başlamadan, AdvancedScheduler'ın hazır yapıları
+(çakışma grafı, başlangıç maskeleri, doluluk ızgarası) üzerinden ucuz alt sınırlar hesaplar:
+1) Koltuk x slot talebi, boş dersliklerin toplam arzını aşıyor mu
+2) Tek bir dersin öğrenci sayısı tüm dersliklerin toplam kapasitesini aşıyor mu
+3) Bir dersin hiç uygun başlangıcı kalmamış mı (hoca müsaitliği, gün uzunluğu, sabit sınavlar)
+4) Ortak öğrencili (birbiriyle çakışan) bir ders kümesinin toplam süresi ufka sığıyor mu
+   (her öğrencinin dersleri ve çakışma grafında açgözlü bulunan klikler)
+5) Lab gerektiren derslerin talebi lab arzını aşıyor mu (yalnızca uyarı: lab boş değilse
+   kurucu arama diğer dersliklere geçebilir)
+Sınırlar güvenlidir: ölümcül bir bulgu varsa problem kesinlikle çözülemez.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Dict, Set
+
+from models import Course, Classroom
+
+# Çakışma grafında açgözlü klik aramasının başlatılacağı en yüksek dereceli ders sayısı
+CLIQUE_SEEDS = 64
+
+# Yalnızca bulgudaki derslerin çözülemediğini gösteren kontroller; bütçeli (kısmi sonuçlu)
+# aramada bu dersler dışarıda bırakılır, diğerleri yine planlanır
+COURSE_CHECKS = ('capacity', 'start_domain')
+
+
+@dataclass
+class FeasibilityIssue:
+    """Fizibilite kontrolünün tek bir bulgusu"""
+    check: str  # seat_supply, capacity, start_domain, clique, lab_demand
+    message: str
+    fatal: bool = True  # False: yalnızca uyarı, arama yine de çalışır
+    course_ids: List[int] = field(default_factory=list)
+
+
+def _seat_supply_issues(scheduler, courses: List[Course], classrooms: List[Classroom]) -> List[FeasibilityIssue]:
+    """Koltuk x slot cinsinden talep / arz ve tek ders kapasite kontrolü"""
+    issues = []
+    capacities = [cl.capacity for cl in classrooms]
+    total_capacity = sum(capacities)
+
+    too_large = [c for c in courses if c.student_count > total_capacity]
+    if too_large:
+        issues.append(FeasibilityIssue(
+            check='capacity',
+            message=(f"{len(too_large)} dersin öğrenci sayısı tüm dersliklerin toplam kapasitesini "
+                     f"({total_capacity}) aşıyor: {', '.join(c.name for c in too_large[:5])}"),
+            course_ids=[c.id for c in too_large]
+        ))
+
+    # Arz: sabit sınavların tuttuğu hücreler hariç, her (gün, slot) hücresindeki boş koltuklar
+    supply = 0
+    for day_slots in scheduler.room_occupancy:
+        for occupied_mask in day_slots:
+            if not occupied_mask:
+                supply += total_capacity
+            else:
+                supply += sum(capacity for i, capacity in enumerate(capacities) if not (occupied_mask >> i) & 1)
+    demand = sum(c.student_count * scheduler.course_slot_counts[c.id] for c in courses)
+    if demand > supply:
+        issues.append(FeasibilityIssue(
+            check='seat_supply',
+            message=(f"Koltuk talebi arzı aşıyor: {demand * scheduler.slot_minutes} koltuk-dakika gerekli, "
+                     f"{supply * scheduler.slot_minutes} koltuk-dakika mevcut")
+        ))
+    return issues
+
+
+def _start_domain_issues(scheduler, courses: List[Course]) -> List[FeasibilityIssue]:
+    """Hiç uygun başlangıcı olmayan dersler"""
+    empty = [c for c in courses if not any(scheduler.course_start_masks[c.id])]
+    if not empty:
+        return []
+    return [FeasibilityIssue(
+        check='start_domain',
+        message=(f"{len(empty)} dersin hiçbir gün uygun başlangıç saati yok (hoca müsaitliği, "
+                 f"gün uzunluğu veya sabit sınavlar): {', '.join(c.name for c in empty[:5])}"),
+        course_ids=[c.id for c in empty]
+    )]
+
+
+def _greedy_clique(graph: Dict[int, Dict[int, int]], seed_id: int, target_ids: Set[int],
+                   slot_counts: Dict[int, int]) -> List[int]:
+    """seed_id'den başlayıp uzun sınavlı komşuları ekleyerek açgözlü klik kur"""
+    clique = [seed_id]
+    candidates = sorted((n for n in graph.get(seed_id, {}) if n in target_ids),
+                        key=lambda n: (slot_counts[n], len(graph[n])), reverse=True)
+    for candidate_id in candidates:
+        neighbors = graph[candidate_id]
+        if all(member_id in neighbors for member_id in clique):
+            clique.append(candidate_id)
+    return clique
+
+
+def _clique_issues(scheduler, courses: List[Course], days: int, slot_count: int) -> List[FeasibilityIssue]:
+    """
+    Birbiriyle çakışan dersler üst üste gelemez; böyle bir kümenin toplam süresi
+    ufkun toplam slot sayısını aşıyorsa problem çözülemez
+    """
+    graph = scheduler.course_conflict_graph
+    slot_counts = scheduler.course_slot_counts
+    target_ids = {c.id for c in courses}
+    horizon = days * slot_count
+
+    # Her öğrencinin dersleri kesin bir kliktir
+    courses_by_student: Dict[str, List[int]] = {}
+    for course_id in target_ids:
+        for student_no in scheduler.student_course_cache.get(course_id, ()):
+            courses_by_student.setdefault(student_no, []).append(course_id)
+    best_clique: List[int] = max(courses_by_student.values(),
+                                 key=lambda ids: sum(slot_counts[i] for i in ids), default=[])
+
+    # Öğrenci kliklerini aşabilecek, birden fazla öğrenciyle örülmüş klikler
+    seeds = sorted(target_ids, key=lambda i: len(graph.get(i, {})), reverse=True)[:CLIQUE_SEEDS]
+    for seed_id in seeds:
+        clique = _greedy_clique(graph, seed_id, target_ids, slot_counts)
+        if sum(slot_counts[i] for i in clique) > sum(slot_counts[i] for i in best_clique):
+            best_clique = clique
+
+    needed = sum(slot_counts[i] for i in best_clique)
+    if needed <= horizon:
+        return []
+    names = {c.id: c.name for c in courses}
+    return [FeasibilityIssue(
+        check='clique',
+        message=(f"Ortak öğrencili {len(best_clique)} ders birbirinden ayrı saatlerde olmalı; toplam "
+                 f"{needed * scheduler.slot_minutes} dakika gerekli, {days} günde "
+                 f"{horizon * scheduler.slot_minutes} dakika var: "
+                 f"{', '.join(names[i] for i in best_clique[:5])}"),
+        course_ids=best_clique
+    )]
+
+
+def _lab_demand_issues(scheduler, courses: List[Course], classrooms: List[Classroom],
+                       days: int, slot_count: int) -> List[FeasibilityIssue]:
+    """Lab gerektiren derslerin koltuk x slot talebi, lab dersliklerin arzıyla karşılaştırılır (uyarı)"""
+    lab_courses = [c for c in courses if c.requires_special_room]
+    if not lab_courses:
+        return []
+    lab_capacity = sum(cl.capacity for cl in classrooms if cl.room_type and 'lab' in cl.room_type.lower())
+    demand = sum(c.student_count * scheduler.course_slot_counts[c.id] for c in lab_courses)
+    supply = lab_capacity * days * slot_count
+    if demand <= supply:
+        return []
+    return [FeasibilityIssue(
+        check='lab_demand',
+        message=(f"{len(lab_courses)} lab dersinin talebi lab dersliklerin kapasitesini aşıyor "
+                 f"({demand * scheduler.slot_minutes} / {supply * scheduler.slot_minutes} koltuk-dakika); "
+                 f"bir kısmı normal dersliklerde yapılacak"),
+        fatal=False,
+        course_ids=[c.id for c in lab_courses]
+    )]
+
+
+def check_feasibility(scheduler, courses: List[Course], classrooms: List[Classroom],
+                      days: int, slot_count: int) -> List[FeasibilityIssue]:
+    """
+    Aramadan önce çözülemezlik kontrolü
+    scheduler: çakışma grafı, başlangıç maskeleri ve doluluk ızgarası (sabit sınavlar işlenmiş)
+    kurulmuş AdvancedScheduler; slot_count: bir gündeki slot sayısı
+    """
+    issues = []
+    issues.extend(_seat_supply_issues(scheduler, courses, classrooms))
+    issues.extend(_start_domain_issues(scheduler, courses))
+    issues.extend(_clique_issues(scheduler, courses, days, slot_count))
+    issues.extend(_lab_demand_issues(scheduler, courses, classrooms, days, slot_count))
+    return issues
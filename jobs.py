@@ -0,0 +1,509 @@
+"""
+Arka Plan Planlama İşleri
+
+Büyük veri setlerinde arama dakikalar sürebilir; /admin/run_scheduler bunu HTTP isteği içinde
+yaparsa istek zaman aşımına uğrar. Bu modül planlamayı ayrı bir süreçte çalıştırır:
+1) Girdi istekte okunur (SchedulingSnapshot), bir SchedulerJob satırı açılır ve süreç başlatılır;
+   istek hemen döner
+2) Süreç aramayı çalıştırır; ilerlemeyi (yerleşen ders, düğüm, geri dönüş, geçen süre) yaklaşık
+   saniyede bir satıra yazar ve aynı anda iptal isteğini okur
+3) Bitince sonuç yeni program sürümü olarak yazılır (sabitlenmiş sınavlar taşınır) ve iş kapanır;
+   iptal edilen işin sonucu yazılmaz
+Yönetici sayfası durumu /admin/scheduler_jobs/<id> üzerinden yoklar. Ayrıca süreç aramanın
+ilerleme olaylarını (yalnızca izleyen bir abone varken) boruyla ana sürece gönderir; ana süreç
+bunları ProgressBroker ile /admin/run_scheduler/stream (SSE) abonelerine dağıtır.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from flask import current_app
+from sqlalchemy import update
+
+from app import db
+from models import SchedulerJob
+from scheduler import (
+    ExamAssignment, ScheduleResult, SchedulingSnapshot, exam_to_assignment, generate_exam_schedule, load_snapshot
+)
+from portfolio import generate_exam_schedule_portfolio
+from decomposition import generate_exam_schedule_decomposed
+from schedule_cache import input_fingerprint, result_cache
+from schedule_store import save_schedule, active_exams, is_worse_than_active
+
+# Çalışan sürecin ilerlemeyi yazıp iptal isteğini okuma aralığı (saniye)
+PROGRESS_INTERVAL = 1.0
+# Çalışan sürecin ana sürece ilerleme olayı gönderme aralığı (saniye)
+EVENT_INTERVAL = 0.5
+# Yavaş bir SSE abonesinin kuyruğunda biriken en fazla olay (dolunca yeni olaylar atlanır)
+SUBSCRIBER_QUEUE_SIZE = 256
+# SSE bağlantısını canlı tutmak için olaysız geçen en uzun süre (saniye)
+KEEPALIVE_SECONDS = 15
+# Çalışan sürecin, aramadan bağımsız olarak işin satırını canlı işaretleme aralığı (saniye)
+HEARTBEAT_INTERVAL = 5 * PROGRESS_INTERVAL
+# Satırı bu kadar süre (saniye) güncellenmeyen aktif iş, süreci ölmüş sayılıp başarısız kapatılır
+JOB_STALE_SECONDS = 60 * PROGRESS_INTERVAL
+
+
+@dataclass
+class SchedulerInput:
+    """Tek bir planlama çalıştırmasının girdisi"""
+    snapshot: SchedulingSnapshot
+    fixed_assignments: List[ExamAssignment]  # sabitlenmiş sınavlar
+    start_date: date
+    options: Dict  # bkz. scheduler_options
+    fingerprint: str
+
+
+def scheduler_options(config) -> Dict:
+    """Sonucu etkileyen planlayıcı ayarları (parmak izine de girer)"""
+    return {
+        'days': 10,
+        'decompose': bool(config.get("SCHEDULER_DECOMPOSE")),
+        'workers': config.get("SCHEDULER_WORKERS", 1),
+        'ordering': config.get("SCHEDULER_ORDERING", "domain"),
+        'time_limit': config.get("SCHEDULER_TIME_LIMIT"),
+        'improve_time': config.get("SCHEDULER_IMPROVE_TIME"),
+    }
+
+
+def scheduler_mode(options: Dict) -> str:
+    """Ayarlara göre çözüm modu: decomposed, portfolio veya sequential"""
+    if options['decompose']:
+        return 'decomposed'
+    if options['workers'] > 1:
+        return 'portfolio'
+    return 'sequential'
+
+
+def load_scheduler_input(config) -> SchedulerInput:
+    """Girdiyi sütun sorgularıyla oku, sabitlenmiş sınavları ve parmak izini hazırla"""
+    snapshot = load_snapshot()
+    fixed_assignments = [exam_to_assignment(exam) for exam in active_exams().filter_by(is_pinned=True).all()]
+    options = scheduler_options(config)
+    start_date = date.today()
+    fingerprint = input_fingerprint(snapshot, start_date=start_date, fixed_assignments=fixed_assignments, **options)
+    return SchedulerInput(snapshot, fixed_assignments, start_date, options, fingerprint)
+
+
+def solve_schedule(scheduler_input: SchedulerInput, should_stop: Optional[Callable[[], bool]] = None,
+                   on_progress: Optional[Callable[[Callable[[], Dict]], None]] = None) -> ScheduleResult:
+    """
+    Ayarlara göre planlayıcıyı çalıştır (bileşenlere ayrıştırarak, paralel portföy veya sıralı)
+    on_progress yalnızca sıralı modda çağrılır; diğer modlarda ilerleme sonuçta yazılır
+    """
+    snapshot = scheduler_input.snapshot
+    options = scheduler_input.options
+    mode = scheduler_mode(options)
+    if mode == 'decomposed':
+        return generate_exam_schedule_decomposed(
+            list(snapshot.courses),
+            list(snapshot.classrooms),
+            days=options['days'],
+            start_date=scheduler_input.start_date,
+            ordering=options['ordering'],
+            workers=options['workers'],
+            time_limit=options['time_limit'],
+            improve_time=options['improve_time'],
+            fixed_assignments=scheduler_input.fixed_assignments,
+            snapshot=snapshot,
+            should_stop=should_stop,
+        )
+    if mode == 'portfolio':
+        return generate_exam_schedule_portfolio(
+            list(snapshot.courses),
+            list(snapshot.classrooms),
+            days=options['days'],
+            start_date=scheduler_input.start_date,
+            workers=options['workers'],
+            time_limit=options['time_limit'],
+            improve_time=options['improve_time'],
+            fixed_assignments=scheduler_input.fixed_assignments,
+            snapshot=snapshot,
+            should_stop=should_stop,
+        )
+    return generate_exam_schedule(
+        list(snapshot.courses),
+        list(snapshot.classrooms),
+        days=options['days'],
+        start_date=scheduler_input.start_date,
+        ordering=options['ordering'],
+        time_limit=options['time_limit'],
+        improve_time=options['improve_time'],
+        fixed_assignments=scheduler_input.fixed_assignments,
+        snapshot=snapshot,
+        should_stop=should_stop,
+        on_progress=on_progress,
+    )
+
+
+def close_stale_job(job: SchedulerJob) -> bool:
+    """
+    Aktif iş JOB_STALE_SECONDS boyunca satırını güncellemediyse (sunucu yeniden başlatıldı, süreç
+    öldürüldü) başarısız olarak kapat ve True dön. Çalışan süreç satırı aramadan bağımsız bir
+    iş parçacığıyla (_heartbeat) canlı tutar; uzun önbellek kurma veya kayıt adımları işi bayat
+    göstermez. Bu süreçten başlatılan işlere dokunulmaz: onların sonlanmasını _collect_job zaten izler
+    """
+    if not job.is_active() or job.id in progress_broker.local_jobs:
+        return False
+    last_seen = job.updated_at or job.started_at or job.created_at
+    if last_seen is None or datetime.utcnow() - last_seen < timedelta(seconds=JOB_STALE_SECONDS):
+        return False
+    if not _finish_job(job, SchedulerJob.FAILED,
+                       f"İş {JOB_STALE_SECONDS:.0f} saniyedir yanıt vermedi; planlama süreci sonlanmış sayıldı."):
+        return False
+    print(f"JOBS: İş #{job.id} yanıt vermediği için başarısız olarak kapatıldı")
+    return True
+
+
+def active_scheduler_job() -> Optional[SchedulerJob]:
+    """Kuyrukta bekleyen veya çalışan iş (aynı anda tek iş çalışır); süreci ölmüş işler önce kapatılır"""
+    for job in SchedulerJob.query.filter(SchedulerJob.status.in_(SchedulerJob.ACTIVE_STATUSES)).all():
+        if not close_stale_job(job):
+            return job
+    return None
+
+
+def _finish_job(job: SchedulerJob, status: str, message: str, schedule: Optional[ScheduleResult] = None) -> bool:
+    """
+    İşi kapat; sonuç varsa son istatistikleri yaz
+    Yazma koşulludur: iş bu arada başka bir istekte kapatıldıysa (ör. yanıt vermiyor sayıldı)
+    satıra dokunulmaz ve False döner
+    """
+    finished_at = datetime.utcnow()
+    values = {SchedulerJob.status: status, SchedulerJob.message: message, SchedulerJob.finished_at: finished_at}
+    if job.started_at is not None:
+        values[SchedulerJob.elapsed_seconds] = round((finished_at - job.started_at).total_seconds(), 1)
+    if schedule is not None:
+        stats = schedule.statistics
+        values[SchedulerJob.scheduled_courses] = stats.get('scheduled_courses', job.scheduled_courses)
+        values[SchedulerJob.total_courses] = stats.get('total_courses', job.total_courses)
+        values[SchedulerJob.nodes] = stats.get('nodes', job.nodes)
+        values[SchedulerJob.backtracks] = stats.get('backtracks', job.backtracks)
+    closed = SchedulerJob.query.filter(
+        SchedulerJob.id == job.id, SchedulerJob.status.in_(SchedulerJob.ACTIVE_STATUSES)
+    ).update(values, synchronize_session=False)
+    db.session.commit()
+    db.session.refresh(job)
+    return closed > 0
+
+
+def _success_message(schedule: ScheduleResult, version_id: int, from_cache: bool = False) -> str:
+    stats = schedule.statistics
+    message = (f"Sınav programı oluşturuldu (sürüm #{version_id})! {stats['scheduled_courses']}/"
+               f"{stats['total_courses']} ders planlandı. {stats['total_classrooms_used']} derslik kullanıldı.")
+    if from_cache:
+        message += " Planlama girdileri değişmediği için önceki sonuç kullanıldı."
+    if not schedule.success:
+        message += " " + schedule.message
+    return message
+
+
+def _worse_message(schedule: ScheduleResult) -> str:
+    stats = schedule.statistics
+    return (f"Kısmi sonuç ({stats['scheduled_courses']}/{stats['total_courses']} ders) yayındaki programdan "
+            f"daha az ders yerleştirdiği için kaydedilmedi; mevcut program korundu. {schedule.message}")
+
+
+class ProgressBroker:
+    """
+    Ana süreçte: iş ilerleme olaylarını bu süreçteki SSE abonelerine dağıtır
+    Abonesi olmayan işin olayı kuyruğa girmeden atılır
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers: Dict[int, List[queue.Queue]] = {}
+        self.local_jobs: Set[int] = set()  # bu süreçten başlatılmış, hâlâ çalışan işler
+        # İş -> alt süreçle paylaşılan bayrak; abonesi varken kurulur, alt süreç yalnızca o zaman olay gönderir
+        self.watch_flags: Dict[int, object] = {}
+
+    def watch(self, job_id: int, flag):
+        with self.lock:
+            self.watch_flags[job_id] = flag
+            if self.subscribers.get(job_id):
+                flag.set()
+
+    def unwatch(self, job_id: int):
+        with self.lock:
+            self.watch_flags.pop(job_id, None)
+
+    def subscribe(self, job_id: int) -> queue.Queue:
+        events = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.setdefault(job_id, []).append(events)
+            flag = self.watch_flags.get(job_id)
+            if flag is not None:
+                flag.set()
+        return events
+
+    def unsubscribe(self, job_id: int, events: queue.Queue):
+        with self.lock:
+            queues = self.subscribers.get(job_id, [])
+            if events in queues:
+                queues.remove(events)
+            if not queues:
+                self.subscribers.pop(job_id, None)
+                flag = self.watch_flags.get(job_id)
+                if flag is not None:
+                    flag.clear()
+
+    def publish(self, job_id: int, event: str, data: Dict):
+        if not self.subscribers.get(job_id):
+            return
+        with self.lock:
+            queues = list(self.subscribers.get(job_id, []))
+        for events in queues:
+            try:
+                events.put_nowait((event, data))
+            except queue.Full:
+                pass
+
+
+# Süreç genelindeki yayıncı
+progress_broker = ProgressBroker()
+
+
+def job_events(job: SchedulerJob) -> Iterator[Tuple[str, Optional[Dict]]]:
+    """
+    İşin ilerleme olayları: (olay, veri); iş bitince ('done', iş) ile biter
+    Bu süreçten başlatılan işlerde olaylar aramanın kendisinden gelir (ScheduleSearch.progress);
+    başka bir sunucu sürecinden başlatılanlarda işin satırı PROGRESS_INTERVAL aralıkla okunur.
+    Olay gelmeden KEEPALIVE_SECONDS geçerse ('keepalive', None) döner
+    """
+    job_id = job.id
+    events = progress_broker.subscribe(job_id)
+    try:
+        # Abone olduktan sonra kontrol: iş bittiyse 'done' olayı ya kuyruktadır ya da satırdan okunur
+        while job_id in progress_broker.local_jobs or not events.empty():
+            try:
+                event, data = events.get(timeout=KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield 'keepalive', None
+                continue
+            yield event, data
+            if event == 'done':
+                return
+    finally:
+        progress_broker.unsubscribe(job_id, events)
+
+    while True:
+        # Yeni işlemde okunur: çalışan sürecin son yazdığı ilerleme görünür
+        db.session.rollback()
+        job = SchedulerJob.query.get(job_id)
+        if job is None:
+            yield 'done', {"id": job_id, "error": "İş kaydı bulunamadı."}
+            return
+        if not job.is_active() or close_stale_job(job):
+            yield 'done', job.to_dict()
+            return
+        yield 'progress', job.to_dict()
+        time.sleep(PROGRESS_INTERVAL)
+
+
+class _JobProgress:
+    """
+    Alt süreçte: aramanın ilerlemesini seyrek aralıklarla işin satırına yazar ve iptal isteğini okur;
+    ana süreçte SSE abonesi varken (watched bayrağı) ilerleme olaylarını da boruyla gönderir.
+    İlerleme sözlüğü yalnızca satır yazılırken ya da olay gönderilirken kurulur
+    """
+
+    def __init__(self, job: SchedulerJob, sender, watched):
+        self.job = job
+        self.sender = sender
+        self.watched = watched
+        self.report: Optional[Callable[[], Dict]] = None  # aramanın anlık durumu (ScheduleSearch.progress)
+        self.started = perf_counter()
+        self.last_sync = self.started
+        self.last_event = self.started
+        self.cancelled = False
+
+    def on_progress(self, report: Callable[[], Dict]):
+        self.report = report
+
+    def should_stop(self) -> bool:
+        now = perf_counter()
+        if (self.report is not None and not self.cancelled and now - self.last_event >= EVENT_INTERVAL
+                and self.watched.is_set()):
+            self.last_event = now
+            self.sender.send(('progress', dict(self.report(), elapsed_seconds=round(now - self.started, 1))))
+        if self.cancelled or now - self.last_sync < PROGRESS_INTERVAL:
+            return self.cancelled
+        self.last_sync = now
+        # Yeni işlemde okunur: yöneticinin başka bir istekte yazdığı iptal bayrağı görünür
+        db.session.refresh(self.job)
+        if self.job.status != SchedulerJob.RUNNING:
+            # İş başka bir istekte kapatıldı (ör. yanıt vermiyor sayıldı): sonucu yazılmayacak, arama durur
+            self.cancelled = True
+            db.session.rollback()
+            return True
+        if self.report is not None:
+            latest = self.report()
+            for key in ('scheduled_courses', 'total_courses', 'nodes', 'backtracks'):
+                setattr(self.job, key, latest[key])
+        self.job.elapsed_seconds = round(now - self.started, 1)
+        self.cancelled = bool(self.job.cancel_requested)
+        db.session.commit()
+        return self.cancelled
+
+
+def _heartbeat(app, job_id: int, stopped: threading.Event):
+    """
+    Alt süreçte (iş parçacığı): aktif işin satırını HEARTBEAT_INTERVAL aralıkla canlı işaretler.
+    Aramanın should_stop kontrollerinden bağımsızdır; önbellek kurma, portföy veya ayrıştırma
+    beklemesi ve kayıt sırasında da iş bayat sayılmaz
+    """
+    with app.app_context():
+        while not stopped.wait(HEARTBEAT_INTERVAL):
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(
+                        update(SchedulerJob)
+                        .where(SchedulerJob.id == job_id, SchedulerJob.status.in_(SchedulerJob.ACTIVE_STATUSES))
+                        .values(updated_at=datetime.utcnow())
+                    )
+            except Exception as exc:
+                print(f"JOBS: İş #{job_id} için canlılık yazılamadı: {exc}")
+
+
+def _run_job(job_id: int, config_name: str, scheduler_input: SchedulerInput, sender, watched):
+    """Alt süreçte: planlamayı çalıştır, ilerlemeyi ve sonucu işin satırına yaz"""
+    from app import create_app
+
+    app = create_app(config_name)
+    result = None
+    stopped = threading.Event()
+    threading.Thread(target=_heartbeat, args=(app, job_id, stopped), daemon=True).start()
+    with app.app_context():
+        job = SchedulerJob.query.get(job_id)
+        if job.cancel_requested:
+            _finish_job(job, SchedulerJob.CANCELLED, "İş başlamadan iptal edildi.")
+        elif _claim_job(job):
+            progress = _JobProgress(job, sender, watched)
+            try:
+                schedule = solve_schedule(scheduler_input, should_stop=progress.should_stop,
+                                          on_progress=progress.on_progress)
+                db.session.refresh(job)
+                if job.status != SchedulerJob.RUNNING:
+                    # Arama sürerken iş başka bir istekte kapatıldı; sonuç yazılmaz
+                    print(f"JOBS: İş #{job_id} arama bitmeden kapatılmış ({job.status}); sonuç kaydedilmedi")
+                elif job.cancel_requested:
+                    _finish_job(job, SchedulerJob.CANCELLED, "İş iptal edildi; mevcut program değiştirilmedi.",
+                                schedule)
+                elif not schedule.exams:
+                    # Hiç sınav yerleşmediyse eski program korunur
+                    _finish_job(job, SchedulerJob.FAILED, "Planlama başarısız: " + schedule.message, schedule)
+                elif is_worse_than_active(schedule):
+                    _finish_job(job, SchedulerJob.FAILED, _worse_message(schedule), schedule)
+                else:
+                    version = save_schedule(schedule)
+                    _finish_job(job, SchedulerJob.SUCCEEDED, _success_message(schedule, version.id), schedule)
+                    result = schedule
+            except Exception as exc:
+                traceback.print_exc()
+                db.session.rollback()
+                _finish_job(job, SchedulerJob.FAILED, f"Planlama hata verdi: {exc}")
+        else:
+            print(f"JOBS: İş #{job_id} başlamadan kapatılmış ({job.status}); planlama çalıştırılmadı")
+    stopped.set()
+    sender.send(('result', result))
+    sender.close()
+
+
+def _claim_job(job: SchedulerJob) -> bool:
+    """Kuyruktaki işi çalışıyor olarak işaretle; iş bu arada kapatıldıysa False dön"""
+    claimed = SchedulerJob.query.filter(
+        SchedulerJob.id == job.id, SchedulerJob.status == SchedulerJob.QUEUED
+    ).update({SchedulerJob.status: SchedulerJob.RUNNING, SchedulerJob.started_at: datetime.utcnow()},
+             synchronize_session=False)
+    db.session.commit()
+    db.session.refresh(job)
+    return claimed > 0
+
+
+def _collect_job(app, job_id: int, process, receiver, fingerprint: str):
+    """
+    Ana süreçte (iş parçacığı): ilerleme olaylarını abonelere dağıt, sonucu önbelleğe al ve
+    süreci topla; süreç sonuç göndermeden sonlandıysa işi başarısız olarak kapat
+    """
+    result = None
+    crashed = True
+    try:
+        while True:
+            kind, payload = receiver.recv()
+            if kind == 'progress':
+                progress_broker.publish(job_id, 'progress', payload)
+                continue
+            result = payload
+            crashed = False
+            break
+    except EOFError:
+        pass
+    finally:
+        receiver.close()
+    process.join()
+    if result is not None:
+        result_cache.put(fingerprint, result)
+    with app.app_context():
+        job = SchedulerJob.query.get(job_id)
+        if crashed and job is not None and job.is_active():
+            _finish_job(job, SchedulerJob.FAILED,
+                        f"Planlama süreci beklenmedik şekilde sonlandı (çıkış kodu {process.exitcode}).")
+        progress_broker.local_jobs.discard(job_id)
+        progress_broker.unwatch(job_id)
+        if job is not None:
+            progress_broker.publish(job_id, 'done', job.to_dict())
+
+
+def start_scheduler_job() -> SchedulerJob:
+    """
+    Planlama işini kaydet ve ayrı bir süreçte başlat; hemen döner
+    Aynı girdi önbellekteyse arama yapılmaz: sonuç hemen yazılır ve iş tamamlanmış döner
+    """
+    app = current_app._get_current_object()
+    scheduler_input = load_scheduler_input(app.config)
+    fixed_course_ids = {a.course_id for a in scheduler_input.fixed_assignments}
+    job = SchedulerJob(
+        status=SchedulerJob.QUEUED,
+        mode=scheduler_mode(scheduler_input.options),
+        total_courses=sum(1 for c in scheduler_input.snapshot.courses
+                          if c.has_exam and c.id not in fixed_course_ids),
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    cached = result_cache.get(scheduler_input.fingerprint)
+    if cached is not None:
+        print(f"JOBS: Girdi değişmemiş ({scheduler_input.fingerprint[:12]}), sonuç önbellekten alındı")
+        job.started_at = job.created_at
+        if is_worse_than_active(cached):
+            _finish_job(job, SchedulerJob.FAILED, _worse_message(cached), cached)
+            return job
+        version = save_schedule(cached)
+        _finish_job(job, SchedulerJob.SUCCEEDED, _success_message(cached, version.id, from_cache=True), cached)
+        return job
+
+    # fork yerine spawn: alt süreç ana sürecin veritabanı bağlantılarını paylaşmaz
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    watched = context.Event()
+    process = context.Process(
+        target=_run_job,
+        args=(job.id, app.config.get("CONFIG_NAME", "development"), scheduler_input, sender, watched),
+    )
+    progress_broker.local_jobs.add(job.id)
+    progress_broker.watch(job.id, watched)
+    process.start()
+    sender.close()
+    threading.Thread(target=_collect_job, args=(app, job.id, process, receiver, scheduler_input.fingerprint),
+                     daemon=True).start()
+    print(f"JOBS: İş #{job.id} başlatıldı (süreç {process.pid}, mod {job.mode})")
+    return job
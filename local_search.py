@@ -0,0 +1,400 @@
+"""
+Sınav Programı İyileştirme - Yerel Arama (Tavlama Benzetimi)
+
+Kurucu arama (scheduler.py) ilk geçerli programda durur; derslik israfı ve yakınlık
+yalnızca ders ders, açgözlü olarak optimize edilir. Bu modül geçerli bir
+ExamGroup listesini, tüm kısıtları koruyarak iyileştirir:
+1) Derslik değişimi: sınavın derslik grubunu aynı saatte yeniden seç
+2) Derslik takası: iki sınavın derslik gruplarını yer değiştir
+3) Saat taşıma: sınavı başka bir (gün, başlangıç) noktasına taşı
+4) Kempe zinciri: iki zaman noktası arasındaki çakışan sınav zincirini yer değiştir
+Her hamlede yalnızca yeri değişen sınavların maliyeti yeniden hesaplanır (artımlı delta).
+"""
+
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass
+from datetime import date, time
+from time import perf_counter
+from typing import List, Dict, Tuple, Optional, Callable
+
+from models import Course, Classroom
+from scheduler import AdvancedScheduler, ExamGroup
+
+# Her ek derslik için maliyet (sınavı bölmek gözetmen ve yönlendirme yükü getirir)
+SPLIT_PENALTY = 20
+# Kempe zincirinde en fazla kaç sınav birlikte taşınır
+MAX_KEMPE_CHAIN = 12
+# Hamle türleri ve seçilme ağırlıkları
+MOVE_WEIGHTS = (("room_change", 3), ("room_swap", 2), ("slot_move", 4), ("kempe", 1))
+
+
+@dataclass
+class PlacedExam:
+    """Yerel aramada bir dersin sınavı: zaman noktası, derslik grubu ve maliyeti"""
+    course: Course
+    day_offset: int
+    start_index: int
+    slot_count: int
+    classroom_mask: int
+    classrooms: List[Classroom]
+    exam_group_id: str
+    cost: float
+
+
+class ScheduleImprover:
+    """
+    Geçerli bir sınav programını tavlama benzetimi ile iyileştirir
+    Maliyet = derslik israfı + bölme cezası - yakınlık bonusu (kurucu aramadaki skorla aynı ölçek)
+    AdvancedScheduler'ın çakışma grafı, başlangıç maskeleri ve yakınlık matrisi kullanılır;
+    bu nedenle generate_exam_schedule çalıştıktan sonra çağrılmalıdır.
+    """
+
+    def __init__(self, scheduler: AdvancedScheduler, courses: List[Course], classrooms: List[Classroom],
+                 days: int, start_date: date, time_slots: List[time], seed: Optional[int] = None):
+        self.scheduler = scheduler
+        self.courses_by_id: Dict[int, Course] = {c.id: c for c in courses}
+        self.classrooms = classrooms
+        self.days = days
+        self.start_date = start_date
+        self.time_slots = time_slots
+        self.random = random.Random(seed)
+
+        # Lab gerektiren dersler yalnızca lab dersliklere taşınabilir (mevcut derslikleri lab ise)
+        self.lab_mask = 0
+        for classroom in classrooms:
+            if classroom.room_type and 'lab' in classroom.room_type.lower():
+                self.lab_mask |= 1 << scheduler.classroom_index[classroom.id]
+
+        self.exams: Dict[int, PlacedExam] = {}  # course_id -> yerleşim
+        self.course_ids: List[int] = []
+        self.total_cost = 0.0
+        self.statistics = {
+            'iterations': 0,
+            'accepted_moves': 0,
+            'improving_moves': 0,
+            'initial_cost': 0.0,
+            'final_cost': 0.0,
+            'elapsed_seconds': 0,
+            'moves': {name: 0 for name, _ in MOVE_WEIGHTS},
+        }
+
+    # ------------------------------------------------------------------
+    # Maliyet ve yerleşim yardımcıları
+    # ------------------------------------------------------------------
+
+    def _group_cost(self, course: Course, classrooms: List[Classroom]) -> float:
+        """Derslik grubunun maliyeti: israf + bölme cezası - yakınlık bonusu"""
+        waste = sum(cl.capacity for cl in classrooms) - course.student_count
+        ordinals = sorted(self.scheduler.classroom_index[cl.id] for cl in classrooms)
+        matrix = self.scheduler.proximity_matrix
+        bonus = 0.0
+        if len(ordinals) == 2:
+            bonus = matrix[ordinals[0]][ordinals[1]] * 20
+        elif len(ordinals) == 3:
+            bonus = (matrix[ordinals[0]][ordinals[1]] + matrix[ordinals[0]][ordinals[2]]
+                     + matrix[ordinals[1]][ordinals[2]]) * 10
+        return waste + SPLIT_PENALTY * (len(classrooms) - 1) - bonus
+
+    def _classroom_mask(self, classrooms: List[Classroom]) -> int:
+        mask = 0
+        for classroom in classrooms:
+            mask |= 1 << self.scheduler.classroom_index[classroom.id]
+        return mask
+
+    def _classrooms_allowed(self, exam: PlacedExam, classroom_mask: int) -> bool:
+        """Kapasite yeterli mi ve lab dersi lab dersliklerde mi kalıyor?"""
+        if exam.course.requires_special_room and exam.classroom_mask & ~self.lab_mask == 0:
+            if classroom_mask & ~self.lab_mask:
+                return False
+        capacity = sum(cl.capacity for i, cl in enumerate(self.classrooms) if (classroom_mask >> i) & 1)
+        return capacity >= exam.course.student_count
+
+    def _release(self, exam: PlacedExam):
+        self.scheduler._release_classrooms(exam.day_offset, exam.start_index, exam.slot_count, exam.classroom_mask)
+
+    def _mark(self, exam: PlacedExam):
+        self.scheduler._mark_classrooms(exam.day_offset, exam.start_index, exam.slot_count, exam.classroom_mask)
+
+    def _start_allowed(self, course_id: int, day_offset: int, start_index: int) -> bool:
+        """Hoca müsaitliği ve gün sonu sınırı (kurucu aramanın başlangıç maskeleri)"""
+        return bool((self.scheduler.course_start_masks[course_id][day_offset] >> start_index) & 1)
+
+    def _student_conflict(self, course_id: int, day_offset: int, start_index: int, slot_count: int,
+                          moved: Dict[int, Tuple[int, int]]) -> bool:
+        """
+        Yeni aralık, çakışan (ortak öğrencili) bir sınavla örtüşüyor mu?
+        moved: aynı hamlede yer değiştiren derslerin yeni (gün, başlangıç) değerleri
+        """
+        for neighbor_id in self.scheduler.course_conflict_graph.get(course_id, {}):
+            neighbor = self.exams.get(neighbor_id)
+            if neighbor is None:
+                continue
+            neighbor_day, neighbor_start = moved.get(neighbor_id, (neighbor.day_offset, neighbor.start_index))
+            if (neighbor_day == day_offset
+                    and neighbor_start < start_index + slot_count
+                    and start_index < neighbor_start + neighbor.slot_count):
+                return True
+        return False
+
+    def _select_classrooms(self, exam: PlacedExam, day_offset: int, start_index: int) -> List[Classroom]:
+        """Aralıktaki boş dersliklerden kurucu aramanın seçim kuralıyla derslik grubu (önbellekli)"""
+        occupied_mask = self.scheduler._occupied_classroom_mask(day_offset, start_index, exam.slot_count)
+        free_mask = self.scheduler.all_classrooms_mask & ~occupied_mask
+        if exam.course.requires_special_room and exam.classroom_mask & ~self.lab_mask == 0:
+            free_mask &= self.lab_mask
+        if not free_mask:
+            return []
+        available = [cl for i, cl in enumerate(self.classrooms) if (free_mask >> i) & 1]
+        return self.scheduler._cached_classroom_combination(exam.course, available, free_mask, verbose=False)
+
+    # ------------------------------------------------------------------
+    # Hamle altyapısı: uygula, delta hesapla, gerekirse geri al
+    # ------------------------------------------------------------------
+
+    def _try_move(self, new_placements: Dict[int, Tuple[int, int, Optional[List[Classroom]]]]) -> Optional[Tuple[float, list]]:
+        """
+        Birden fazla sınavı birlikte yeniden yerleştir
+        new_placements: course_id -> (gün, başlangıç, derslikler veya None = yeniden seç)
+        Başarılıysa (delta, geri alma kaydı), kısıt ihlalinde None döner (durum değişmez)
+        """
+        moved = {course_id: (day_offset, start_index)
+                 for course_id, (day_offset, start_index, _) in new_placements.items()}
+        undo = []
+        for course_id in new_placements:
+            exam = self.exams[course_id]
+            undo.append((exam, exam.day_offset, exam.start_index, exam.classroom_mask, exam.classrooms, exam.cost))
+            self._release(exam)
+
+        delta = 0.0
+        placed = []
+        feasible = True
+        for course_id, (day_offset, start_index, classrooms) in new_placements.items():
+            exam = self.exams[course_id]
+            if (day_offset, start_index) != (exam.day_offset, exam.start_index):
+                if not self._start_allowed(course_id, day_offset, start_index) or \
+                        self._student_conflict(course_id, day_offset, start_index, exam.slot_count, moved):
+                    feasible = False
+                    break
+            if classrooms is None:
+                classrooms = self._select_classrooms(exam, day_offset, start_index)
+                if not classrooms:
+                    feasible = False
+                    break
+            classroom_mask = self._classroom_mask(classrooms)
+            if self.scheduler._occupied_classroom_mask(day_offset, start_index, exam.slot_count) & classroom_mask:
+                feasible = False
+                break
+            exam.day_offset, exam.start_index = day_offset, start_index
+            exam.classroom_mask, exam.classrooms = classroom_mask, classrooms
+            new_cost = self._group_cost(exam.course, classrooms)
+            delta += new_cost - exam.cost
+            exam.cost = new_cost
+            self._mark(exam)
+            placed.append(exam)
+
+        if not feasible:
+            for exam in placed:
+                self._release(exam)
+            self._restore(undo)
+            return None
+        return delta, undo
+
+    def _restore(self, undo: list):
+        """_try_move ile yapılan değişiklikleri geri al (derslikler zaten boşaltılmış olmalı)"""
+        for exam, day_offset, start_index, classroom_mask, classrooms, cost in undo:
+            exam.day_offset, exam.start_index = day_offset, start_index
+            exam.classroom_mask, exam.classrooms, exam.cost = classroom_mask, classrooms, cost
+            self._mark(exam)
+
+    def _revert(self, undo: list):
+        for exam, *_ in undo:
+            self._release(exam)
+        self._restore(undo)
+
+    # ------------------------------------------------------------------
+    # Hamleler
+    # ------------------------------------------------------------------
+
+    def _room_change_move(self) -> Optional[Tuple[float, list]]:
+        exam = self.exams[self.random.choice(self.course_ids)]
+        return self._try_move({exam.course.id: (exam.day_offset, exam.start_index, None)})
+
+    def _room_swap_move(self) -> Optional[Tuple[float, list]]:
+        first = self.exams[self.random.choice(self.course_ids)]
+        second = self.exams[self.random.choice(self.course_ids)]
+        if first is second:
+            return None
+        if not self._classrooms_allowed(first, second.classroom_mask) or \
+                not self._classrooms_allowed(second, first.classroom_mask):
+            return None
+        return self._try_move({
+            first.course.id: (first.day_offset, first.start_index, second.classrooms),
+            second.course.id: (second.day_offset, second.start_index, first.classrooms),
+        })
+
+    def _random_start(self, course_id: int) -> Optional[Tuple[int, int]]:
+        """Dersin başlangıç maskesinden rastgele bir (gün, başlangıç)"""
+        day_masks = self.scheduler.course_start_masks[course_id]
+        open_days = [day_offset for day_offset in range(self.days) if day_masks[day_offset]]
+        if not open_days:
+            return None
+        day_offset = self.random.choice(open_days)
+        mask = day_masks[day_offset]
+        starts = [bit for bit in range(mask.bit_length()) if (mask >> bit) & 1]
+        return day_offset, self.random.choice(starts)
+
+    def _slot_move(self) -> Optional[Tuple[float, list]]:
+        exam = self.exams[self.random.choice(self.course_ids)]
+        target = self._random_start(exam.course.id)
+        if target is None or target == (exam.day_offset, exam.start_index):
+            return None
+        return self._try_move({exam.course.id: (target[0], target[1], None)})
+
+    def _kempe_move(self) -> Optional[Tuple[float, list]]:
+        """
+        Kempe zinciri: sınavı hedef zaman noktasına taşırken onunla örtüşecek, hedef noktadaki
+        çakışan sınavlar da karşı noktaya taşınır (zincir her iki yönde büyür)
+        """
+        exam = self.exams[self.random.choice(self.course_ids)]
+        target = self._random_start(exam.course.id)
+        source = (exam.day_offset, exam.start_index)
+        if target is None or target == source:
+            return None
+
+        chain: Dict[int, Tuple[int, int]] = {exam.course.id: target}
+        queue = [exam.course.id]
+        while queue:
+            course_id = queue.pop()
+            new_day, new_start = chain[course_id]
+            slot_count = self.exams[course_id].slot_count
+            for neighbor_id in self.scheduler.course_conflict_graph.get(course_id, {}):
+                neighbor = self.exams.get(neighbor_id)
+                if neighbor is None or neighbor_id in chain:
+                    continue
+                neighbor_point = (neighbor.day_offset, neighbor.start_index)
+                if neighbor_point not in (source, target):
+                    continue
+                if (neighbor.day_offset == new_day
+                        and neighbor.start_index < new_start + slot_count
+                        and new_start < neighbor.start_index + neighbor.slot_count):
+                    chain[neighbor_id] = source if neighbor_point == target else target
+                    queue.append(neighbor_id)
+                    if len(chain) > MAX_KEMPE_CHAIN:
+                        return None
+
+        return self._try_move({
+            course_id: (day_offset, start_index, None)
+            for course_id, (day_offset, start_index) in chain.items()
+        })
+
+    # ------------------------------------------------------------------
+    # Ana döngü
+    # ------------------------------------------------------------------
+
+    def _load(self, groups: List[ExamGroup]):
+        """Sınav kayıtlarını ders bazlı yerleşimlere çevir ve doluluk ızgarasını kur"""
+        classrooms_by_id = {cl.id: cl for cl in self.classrooms}
+        self.scheduler._build_occupancy_grid(self.days, len(self.time_slots))
+        for day_offset, start_index, slot_count, classroom_mask in self.scheduler.fixed_intervals:
+            self.scheduler._mark_classrooms(day_offset, start_index, slot_count, classroom_mask)
+        self.exams = {}
+        for group in groups:
+            course = self.courses_by_id[group.course_id]
+            classrooms = [classrooms_by_id[classroom_id] for classroom_id in group.classroom_ids]
+            classroom_mask = 0
+            for classroom in classrooms:
+                classroom_mask |= 1 << self.scheduler.classroom_index[classroom.id]
+            self.exams[course.id] = PlacedExam(
+                course=course,
+                day_offset=group.day_offset,
+                start_index=group.start_index,
+                slot_count=self.scheduler.course_slot_counts[course.id],
+                classroom_mask=classroom_mask,
+                classrooms=classrooms,
+                exam_group_id=group.exam_group_id,
+                cost=self._group_cost(course, classrooms)
+            )
+
+        for exam in self.exams.values():
+            self._mark(exam)
+        self.course_ids = list(self.exams)
+        self.total_cost = sum(exam.cost for exam in self.exams.values())
+
+    def _snapshot(self) -> Dict[int, Tuple[int, int, List[Classroom]]]:
+        return {course_id: (exam.day_offset, exam.start_index, exam.classrooms)
+                for course_id, exam in self.exams.items()}
+
+    def _to_groups(self, snapshot: Dict[int, Tuple[int, int, List[Classroom]]]) -> List[ExamGroup]:
+        return [
+            ExamGroup(course_id, day_offset, start_index, tuple(classroom.id for classroom in classrooms),
+                      self.exams[course_id].exam_group_id)
+            for course_id, (day_offset, start_index, classrooms) in snapshot.items()
+        ]
+
+    def improve(self, groups: List[ExamGroup], time_limit: float,
+                initial_temperature: float = 10.0, final_temperature: float = 0.1,
+                should_stop: Optional[Callable[[], bool]] = None) -> List[ExamGroup]:
+        """
+        Tavlama benzetimi: iyileştiren hamleler her zaman, kötüleştirenler exp(-delta/T)
+        olasılıkla kabul edilir; sıcaklık süre boyunca geometrik olarak düşer.
+        Bulunan en düşük maliyetli program döner.
+        should_stop: ara ara çağrılır, True dönerse iyileştirme erken biter
+        """
+        self._load(groups)
+        self.statistics['initial_cost'] = round(self.total_cost, 2)
+        if not self.course_ids or time_limit <= 0:
+            self.statistics['final_cost'] = self.statistics['initial_cost']
+            return groups
+
+        moves = {
+            "room_change": self._room_change_move,
+            "room_swap": self._room_swap_move,
+            "slot_move": self._slot_move,
+            "kempe": self._kempe_move,
+        }
+        move_names = [name for name, _ in MOVE_WEIGHTS]
+        move_weights = [weight for _, weight in MOVE_WEIGHTS]
+
+        best_cost = self.total_cost
+        best_snapshot = None  # None: başlangıç programı en iyisi
+        started = perf_counter()
+        temperature_ratio = final_temperature / initial_temperature
+
+        while True:
+            elapsed = perf_counter() - started
+            if elapsed >= time_limit:
+                break
+            if should_stop is not None and self.statistics['iterations'] % 256 == 0 and should_stop():
+                break
+            temperature = initial_temperature * temperature_ratio ** (elapsed / time_limit)
+            self.statistics['iterations'] += 1
+
+            move_name = self.random.choices(move_names, move_weights)[0]
+            outcome = moves[move_name]()
+            if outcome is None:
+                continue
+            delta, undo = outcome
+
+            if delta <= 0 or self.random.random() < math.exp(-delta / temperature):
+                self.total_cost += delta
+                self.statistics['accepted_moves'] += 1
+                self.statistics['moves'][move_name] += 1
+                if delta < 0:
+                    self.statistics['improving_moves'] += 1
+                if self.total_cost < best_cost - 1e-9:
+                    best_cost = self.total_cost
+                    best_snapshot = self._snapshot()
+            else:
+                self._revert(undo)
+
+        self.statistics['elapsed_seconds'] = round(perf_counter() - started, 3)
+        self.statistics['final_cost'] = round(best_cost, 2)
+        print(f"LOCAL SEARCH: maliyet {self.statistics['initial_cost']} -> {self.statistics['final_cost']} "
+              f"({self.statistics['iterations']} iterasyon)")
+
+        if best_snapshot is None:
+            return groups
+        return self._to_groups(best_snapshot)
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 
 from app import db
@@ -142,8 +143,90 @@ class Exam(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     # Birden fazla derslik kullanılıyorsa grup bilgisi
     exam_group_id = db.Column("sinav_grup_id", db.String(50))  # Aynı sınavın farklı dersliklerini gruplar
+    # Rektörlükçe sabitlenen sınavlar: planlayıcı bunları yerinden oynatmaz, etraflarına planlar
+    is_pinned = db.Column("sabit_mi", db.Boolean, default=False)
+    # Satırın ait olduğu program sürümü; yayında olan, aktif sürümün satırlarıdır (bkz. ScheduleVersion)
+    version_id = db.Column("surum_id", db.Integer, db.ForeignKey("schedule_versions.id"), index=True)
 
     course = db.relationship("Course", back_populates="exams")
     classroom = db.relationship("Classroom", back_populates="exams")
 
 
+class ScheduleVersion(db.Model):
+    """
+    Kaydedilmiş bir sınav programı sürümü (her planlama, onarım ve temizleme yeni sürüm açar)
+    Aynı anda tek sürüm aktiftir; eski bir sürüme dönmek yalnızca aktif bayrağını taşır
+    """
+    __tablename__ = "schedule_versions"
+
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column("kaynak", db.String(20), nullable=False)  # run / repair / clear / legacy
+    message = db.Column("mesaj", db.Text)
+    statistics = db.Column("istatistik", db.Text)  # ScheduleResult.statistics (JSON)
+    row_count = db.Column("satir_sayisi", db.Integer, default=0)
+    is_active = db.Column("aktif_mi", db.Boolean, default=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    activated_at = db.Column(db.DateTime)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "source": self.source,
+            "message": self.message,
+            "statistics": json.loads(self.statistics) if self.statistics else {},
+            "row_count": self.row_count,
+            "is_active": bool(self.is_active),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "activated_at": self.activated_at.isoformat() if self.activated_at else None,
+        }
+
+
+class SchedulerJob(db.Model):
+    """Arka planda (ayrı süreçte) çalışan planlama işi: durum, ilerleme ve sonuç özeti"""
+    __tablename__ = "scheduler_jobs"
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column("durum", db.String(20), nullable=False, default=QUEUED)
+    mode = db.Column("mod", db.String(20))  # sequential / portfolio / decomposed
+    # İlerleme: çalışan süreç yaklaşık saniyede bir günceller
+    scheduled_courses = db.Column("yerlesen_ders", db.Integer, default=0)
+    total_courses = db.Column("toplam_ders", db.Integer, default=0)
+    nodes = db.Column("dugum", db.Integer, default=0)
+    backtracks = db.Column("geri_donus", db.Integer, default=0)
+    elapsed_seconds = db.Column("gecen_sure", db.Float, default=0)
+    message = db.Column("mesaj", db.Text)
+    # Yönetici iptal ister; çalışan süreç bir sonraki kontrolde aramayı durdurur ve sonucu yazmaz
+    cancel_requested = db.Column("iptal_istendi", db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Satıra son yazılma zamanı; çalışan süreç ilerleme ve canlılık yazdıkça ilerler (süreci ölen iş tespiti)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def is_active(self) -> bool:
+        return self.status in self.ACTIVE_STATUSES
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "mode": self.mode,
+            "scheduled_courses": self.scheduled_courses,
+            "total_courses": self.total_courses,
+            "nodes": self.nodes,
+            "backtracks": self.backtracks,
+            "elapsed_seconds": self.elapsed_seconds,
+            "message": self.message,
+            "cancel_requested": bool(self.cancel_requested),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,160 @@
+"""
+Paralel Portföy Çözümü
+
+Aynı problemi farklı sıralama stratejileri ve rastgele tohumlarla birden fazla süreçte
+(ProcessPoolExecutor) çözer. İlk tam çözüm alınır ve diğer süreçler iptal edilir;
+süre içinde tam çözüm bulunamazsa en çok dersi yerleştiren (eşitlikte en az derslik
+israfı olan) sonuç döner. Süreçlere ORM nesneleri yerine pickle'lanabilir bir
+SchedulingSnapshot gönderilir; süreçler veritabanına bağlanmaz.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date
+from time import perf_counter
+from typing import Callable, List, Optional, Tuple
+
+from models import Course, Classroom
+from scheduler import (
+    AdvancedScheduler, ExamAssignment, ScheduleResult, SchedulingSnapshot, ORDERING_STRATEGIES,
+    build_snapshot
+)
+
+# Süreçlerin kendi süre sınırı dolduktan sonra sonuç göndermesi için tanınan ek süre (saniye)
+RESULT_GRACE_SECONDS = 10
+# Süreçler beklenirken dış iptal isteğinin (should_stop) kontrol aralığı (saniye)
+STOP_POLL_SECONDS = 0.5
+
+# Alt süreçte, ana sürecin iptal sinyali (initializer ile atanır)
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _solve_in_worker(snapshot: SchedulingSnapshot, days: int, start_date: date, ordering: str, seed: int,
+                     time_limit: Optional[float], improve_time: Optional[float],
+                     fixed_assignments: List[ExamAssignment]) -> ScheduleResult:
+    """Alt süreçte tek bir portföy üyesini çöz"""
+    scheduler = AdvancedScheduler(snapshot=snapshot)
+    return scheduler.generate_exam_schedule(
+        list(snapshot.courses), list(snapshot.classrooms), days, start_date, ordering,
+        time_limit=time_limit, improve_time=improve_time, seed=seed,
+        should_stop=_stop_event.is_set if _stop_event is not None else None,
+        fixed_assignments=fixed_assignments
+    )
+
+
+def _portfolio_members(workers: int, orderings: Tuple[str, ...]) -> List[Tuple[str, int]]:
+    """
+    (sıralama stratejisi, tohum) çiftleri: önce her strateji tohumsuz (sıralı çözümle aynı),
+    sonra karıştırılmış tohumlarla tekrar
+    """
+    return [(orderings[i % len(orderings)], i // len(orderings)) for i in range(workers)]
+
+
+def _result_score(result: ScheduleResult, capacities: dict) -> Tuple[int, int]:
+    """Sonuç karşılaştırma anahtarı: (yerleşen ders sayısı, -derslik israfı); büyük olan daha iyi"""
+    seats = sum(capacities.get(exam.classroom_id, 0) for exam in result.exams)
+    return result.statistics.get('scheduled_courses', 0), -seats
+
+
+def generate_exam_schedule_portfolio(courses: List[Course], classrooms: List[Classroom],
+                                     days: int = 7, start_date: Optional[date] = None,
+                                     workers: Optional[int] = None, time_limit: Optional[float] = None,
+                                     improve_time: Optional[float] = None,
+                                     orderings: Tuple[str, ...] = ORDERING_STRATEGIES,
+                                     fixed_assignments: Optional[List[ExamAssignment]] = None,
+                                     snapshot: Optional[SchedulingSnapshot] = None,
+                                     should_stop: Optional[Callable[[], bool]] = None) -> ScheduleResult:
+    """
+    Portföy modunda sınav programı oluştur
+    workers: süreç sayısı (varsayılan: işlemci sayısı)
+    time_limit: her süreç için arama süresi sınırı (saniye)
+    fixed_assignments: sabit sınavlar (bkz. AdvancedScheduler.generate_exam_schedule)
+    snapshot: önceden alınmış girdi kopyası (verilmezse courses / classrooms için alınır)
+    should_stop: süreçler beklenirken ara ara çağrılır, True dönerse tüm süreçler iptal edilir
+    """
+    if start_date is None:
+        start_date = date.today()
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if snapshot is None:
+        snapshot = build_snapshot(courses, classrooms)
+    members = _portfolio_members(workers, orderings)
+    capacities = {cl.id: cl.capacity for cl in snapshot.classrooms}
+    wait_limit = None
+    if time_limit is not None:
+        wait_limit = time_limit + (improve_time or 0) + RESULT_GRACE_SECONDS
+
+    print(f"PORTFOLIO: {workers} süreç başlatılıyor -> {members}")
+
+    stop_event = multiprocessing.Event()
+    results: List[Tuple[Tuple[str, int], ScheduleResult]] = []
+    winner: Optional[Tuple[Tuple[str, int], ScheduleResult]] = None
+
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(stop_event,))
+    futures = {}
+    collected = set()
+    try:
+        for ordering, seed in members:
+            future = executor.submit(_solve_in_worker, snapshot, days, start_date, ordering, seed,
+                                     time_limit, improve_time, fixed_assignments or [])
+            futures[future] = (ordering, seed)
+        deadline = perf_counter() + wait_limit if wait_limit is not None else None
+        pending = set(futures)
+        while pending and winner is None:
+            if deadline is not None and perf_counter() >= deadline:
+                print("PORTFOLIO: Bekleme süresi doldu, süreçler durduruluyor")
+                break
+            if should_stop is not None and should_stop():
+                print("PORTFOLIO: İptal istendi, süreçler durduruluyor")
+                break
+            done, pending = wait(pending, timeout=STOP_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                collected.add(future)
+                if future.exception() is not None:
+                    print(f"PORTFOLIO: {futures[future]} hata verdi: {future.exception()}")
+                    continue
+                results.append((futures[future], future.result()))
+                if results[-1][1].success:
+                    winner = results[-1]
+                    break
+    finally:
+        # Diğer süreçleri iptal et; çalışanlar bir sonraki kontrolde en iyi kısmi sonuçlarıyla döner
+        stop_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    if winner is None:
+        for future, member in futures.items():
+            if future not in collected and not future.cancelled() and future.exception() is None:
+                results.append((member, future.result()))
+
+    if winner is None:
+        if not results:
+            return ScheduleResult(
+                success=False,
+                message="Portföy süreçlerinden sonuç alınamadı.",
+                exams=[],
+                statistics={}
+            )
+        winner = max(results, key=lambda item: _result_score(item[1], capacities))
+
+    (ordering, seed), result = winner
+    result.statistics['portfolio'] = {
+        'workers': workers,
+        'winner': {'ordering': ordering, 'seed': seed},
+        'results': [
+            {'ordering': member[0], 'seed': member[1], 'success': member_result.success,
+             'scheduled_courses': member_result.statistics.get('scheduled_courses', 0)}
+            for member, member_result in results
+        ],
+    }
+    print(f"PORTFOLIO: Seçilen sonuç -> {ordering} (tohum {seed}): {result.message}")
+    return result
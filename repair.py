@@ -0,0 +1,273 @@
+"""
+Artımlı Onarım ile Yeniden Planlama
+
+Bir dersin öğrenci sayısı değiştiğinde veya bir derslik sınava kapatıldığında tüm programı
+silip baştan kurmak yerine mevcut Exam kayıtları başlangıç noktası olarak kullanılır:
+1) Artık geçerli olmayan sınavlar bulunur (derslik kapalı/yetersiz, süre değişmiş,
+   hoca müsait değil, öğrenci veya derslik çakışması) ve yeni dersler eklenir
+2) Bu sınavlar ve doğrudan çakıştıkları (ortak öğrencili) sınavlar yerinden alınır
+3) Yalnızca bu komşuluk, kalan program sabit tutularak yeniden çözülür
+   (her ders önce eski gün/saat ve dersliklerinde denenir)
+4) Veritabanına sadece değişen satırlar yazılır (ScheduleDiff)
+Sabitlenmiş (is_pinned) sınavlara hiç dokunulmaz; onlarla çakışan sınavlar yer değiştirir.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Dict, Tuple, Optional, Set
+
+from models import Course, Classroom, Exam
+from scheduler import (
+    AdvancedScheduler, ExamAssignment, ScheduleResult, SchedulingSnapshot, build_snapshot, exam_to_assignment
+)
+
+
+@dataclass
+class ScheduleDiff:
+    """Onarımın veritabanına uygulanacak farkı"""
+    removed_exam_ids: List[int]
+    added: List[ExamAssignment]
+
+
+def _row_key(row) -> Tuple[int, date, object, object]:
+    return row.classroom_id, row.date, row.start_time, row.end_time
+
+
+def _clashes(row, placed: List[ExamAssignment], neighbors: Dict[int, int]) -> bool:
+    """Satır, yerleşik bir satırla aynı derslikte ya da ortak öğrencili bir dersle aynı anda mı"""
+    return any(
+        other.date == row.date and other.start_time < row.end_time and row.start_time < other.end_time
+        and (other.classroom_id == row.classroom_id or other.course_id in neighbors)
+        for other in placed
+    )
+
+
+def _find_affected_courses(scheduler: AdvancedScheduler, courses_by_id: Dict[int, Course],
+                           classrooms: List[Classroom], groups: Dict[int, List[Exam]],
+                           pinned_course_ids: Set[int], days: int, start_date: date) -> Set[int]:
+    """
+    Mevcut programda artık geçerli olmayan sınavların dersleri
+    Sabit sınavlar her durumda yerinde kabul edilir
+    """
+    time_slots = scheduler.generate_time_slots(slot_minutes=scheduler.slot_minutes)
+    slot_lookup = {slot: i for i, slot in enumerate(time_slots)}
+    capacities = {cl.id: cl.capacity for cl in classrooms}
+    scheduler._build_course_start_masks([courses_by_id[c] for c in groups if c in courses_by_id],
+                                        days, time_slots, start_date)
+    scheduler._build_occupancy_grid(days, len(time_slots))
+
+    affected = set()
+    accepted: Dict[int, Tuple[int, int, int]] = {}  # course_id -> (gün, başlangıç, slot sayısı)
+
+    # Sabit sınavlar koşulsuz yerinde kalır
+    for course_id in pinned_course_ids:
+        for row in groups[course_id]:
+            interval = scheduler._assignment_interval(row, days, time_slots, start_date)
+            ordinal = scheduler.classroom_index.get(row.classroom_id)
+            if interval is not None and ordinal is not None:
+                scheduler._mark_classrooms(interval[0], interval[1], interval[2], 1 << ordinal)
+                accepted[course_id] = interval
+
+    # Büyük dersler yerinde kalsın: çakışmada küçük olan yerinden alınır
+    for course_id in sorted((c for c in groups if c in courses_by_id and c not in pinned_course_ids),
+                            key=lambda c: courses_by_id[c].student_count, reverse=True):
+        course = courses_by_id[course_id]
+        rows = groups[course_id]
+        first = rows[0]
+
+        # Derslik kapalı / silinmiş veya kapasite yetersiz
+        if any(row.classroom_id not in capacities for row in rows) or \
+                sum(capacities[row.classroom_id] for row in rows) < course.student_count:
+            affected.add(course_id)
+            continue
+
+        # Aynı sınavın satırları farklı zamanlarda veya süre değişmiş
+        if len({(row.date, row.start_time, row.end_time) for row in rows}) > 1:
+            affected.add(course_id)
+            continue
+        duration = (first.end_time.hour * 60 + first.end_time.minute) - (first.start_time.hour * 60 + first.start_time.minute)
+        if duration != course.exam_duration:
+            affected.add(course_id)
+            continue
+
+        # Ufuk dışında, ızgaraya oturmuyor veya hoca / gün sonu kısıtı ihlal ediliyor
+        day_offset = (first.date - start_date).days
+        start_index = slot_lookup.get(first.start_time)
+        if not 0 <= day_offset < days or start_index is None or \
+                not (scheduler.course_start_masks[course_id][day_offset] >> start_index) & 1:
+            affected.add(course_id)
+            continue
+        slot_count = scheduler.course_slot_counts[course_id]
+
+        # Derslik veya öğrenci çakışması (yerinde kalan sınavlarla)
+        classroom_mask = 0
+        for row in rows:
+            classroom_mask |= 1 << scheduler.classroom_index[row.classroom_id]
+        if scheduler._occupied_classroom_mask(day_offset, start_index, slot_count) & classroom_mask:
+            affected.add(course_id)
+            continue
+        if any(
+            neighbor_id in accepted
+            and accepted[neighbor_id][0] == day_offset
+            and accepted[neighbor_id][1] < start_index + slot_count
+            and start_index < accepted[neighbor_id][1] + accepted[neighbor_id][2]
+            for neighbor_id in scheduler.course_conflict_graph.get(course_id, {})
+        ):
+            affected.add(course_id)
+            continue
+
+        scheduler._mark_classrooms(day_offset, start_index, slot_count, classroom_mask)
+        accepted[course_id] = (day_offset, start_index, slot_count)
+
+    return affected
+
+
+def repair_exam_schedule(courses: List[Course], classrooms: List[Classroom], existing_exams: List[Exam],
+                         days: int = 7, start_date: Optional[date] = None, ordering: str = "student_count",
+                         time_limit: Optional[float] = None,
+                         snapshot: Optional[SchedulingSnapshot] = None) -> Tuple[ScheduleResult, ScheduleDiff]:
+    """
+    Mevcut programı onar
+    courses / classrooms: güncel sınavı olan dersler ve sınava uygun derslikler
+    existing_exams: mevcut Exam kayıtları (başlangıç noktası)
+    start_date verilmezse mevcut programın ilk günü kullanılır
+    snapshot: önceden alınmış girdi kopyası (verilmezse courses / classrooms için alınır)
+    """
+    if start_date is None:
+        start_date = min((exam.date for exam in existing_exams), default=date.today())
+    if existing_exams:
+        days = max(days, (max(exam.date for exam in existing_exams) - start_date).days + 1)
+
+    if snapshot is None:
+        snapshot = build_snapshot(courses, classrooms)
+    courses_by_id = {c.id: c for c in snapshot.courses if c.has_exam}
+    classrooms = list(snapshot.classrooms)
+
+    groups: Dict[int, List[Exam]] = {}
+    for exam in existing_exams:
+        groups.setdefault(exam.course_id, []).append(exam)
+    pinned_course_ids = {exam.course_id for exam in existing_exams if exam.is_pinned}
+
+    checker = AdvancedScheduler(snapshot=snapshot)
+    checker._build_student_course_cache()
+    checker._build_conflict_graph()
+    checker._build_classroom_index(classrooms)
+    checker._build_instructor_availability_index()
+    affected = _find_affected_courses(checker, courses_by_id, classrooms, groups, pinned_course_ids, days, start_date)
+
+    removed_courses = [course_id for course_id in groups
+                       if course_id not in courses_by_id and course_id not in pinned_course_ids]
+    new_courses = [course_id for course_id in courses_by_id if course_id not in groups]
+
+    # Etkilenen sınavlar ve doğrudan çakıştıkları yerinde duran sınavlar yerinden alınır
+    unassigned = set(affected)
+    for course_id in affected:
+        for neighbor_id in checker.course_conflict_graph.get(course_id, {}):
+            if neighbor_id in groups and neighbor_id in courses_by_id and neighbor_id not in pinned_course_ids:
+                unassigned.add(neighbor_id)
+    unassigned.update(new_courses)
+
+    print(f"REPAIR: {len(affected)} etkilenen, {len(unassigned)} yeniden planlanacak, "
+          f"{len(new_courses)} yeni, {len(removed_courses)} kaldırılan ders")
+
+    fixed = [exam_to_assignment(exam) for course_id, rows in groups.items()
+             if course_id not in unassigned and (course_id in courses_by_id or course_id in pinned_course_ids)
+             for exam in rows]
+    warm_start = [exam_to_assignment(exam) for course_id in unassigned for exam in groups.get(course_id, [])]
+
+    new_exams: List[ExamAssignment] = []
+    statistics = {}
+    success = True
+    if unassigned:
+        solver = AdvancedScheduler(snapshot=snapshot)
+        result = solver.generate_exam_schedule(
+            list(courses_by_id.values()), classrooms, days, start_date, ordering,
+            time_limit=time_limit, fixed_assignments=fixed, warm_start=warm_start
+        )
+        new_exams = result.exams
+        statistics = result.statistics
+        success = result.success
+
+    # Satır bazında fark: aynı (derslik, tarih, saat) satırları dokunulmadan kalır
+    removed_exam_ids = [exam.id for course_id in removed_courses for exam in groups[course_id]]
+    added: List[ExamAssignment] = []
+    new_by_course: Dict[int, List[ExamAssignment]] = {}
+    for assignment in new_exams:
+        new_by_course.setdefault(assignment.course_id, []).append(assignment)
+
+    changed_courses = 0
+    keep_candidates: List[int] = []
+    for course_id in unassigned:
+        old_rows = groups.get(course_id, [])
+        new_rows = new_by_course.get(course_id, [])
+        if old_rows and not new_rows:
+            keep_candidates.append(course_id)
+            continue
+        old_keys = {_row_key(row) for row in old_rows}
+        new_keys = {_row_key(row) for row in new_rows}
+        if old_keys == new_keys:
+            continue
+        changed_courses += 1
+        removed_exam_ids.extend(row.id for row in old_rows if _row_key(row) not in new_keys)
+        for assignment in new_rows:
+            if _row_key(assignment) in old_keys:
+                continue
+            # Aynı oturumda kalan sınav eski grup kimliğini korur
+            same_sitting = next((row for row in old_rows
+                                 if (row.date, row.start_time) == (assignment.date, assignment.start_time)), None)
+            if same_sitting is not None:
+                assignment.exam_group_id = same_sitting.exam_group_id
+            added.append(assignment)
+
+    # Çözücü yeni yer bulamadıysa (fizibilite hatası, bütçe bitti) sınav eski yerinde kalır; ancak o
+    # derslik ve saatler çözücüye serbest verildiğinden yeni yerleşimlerle çakışan eski satırlar silinir
+    kept: List[ExamAssignment] = []
+    kept_courses: List[str] = []
+    placed = fixed + new_exams
+    for course_id in sorted(keep_candidates, key=lambda c: courses_by_id[c].student_count, reverse=True):
+        old_rows = groups[course_id]
+        neighbors = checker.course_conflict_graph.get(course_id, {})
+        if any(_clashes(row, placed, neighbors) for row in old_rows):
+            changed_courses += 1
+            removed_exam_ids.extend(row.id for row in old_rows)
+            continue
+        rows = [exam_to_assignment(row) for row in old_rows]
+        kept.extend(rows)
+        placed = placed + rows
+        kept_courses.append(courses_by_id[course_id].name)
+
+    # Eski yerinde bırakılan dersler planlanmış sayılmaz; kept_courses altında ayrıca raporlanır
+    scheduled_courses = len({a.course_id for a in fixed}) + len(new_by_course)
+    statistics.update({
+        'total_courses': len(courses_by_id),
+        'scheduled_courses': scheduled_courses,
+        'total_classrooms_used': len({a.classroom_id for a in fixed + kept} | {a.classroom_id for a in new_exams}),
+        'repair': {
+            'affected_courses': len(affected),
+            'unassigned_courses': len(unassigned),
+            'new_courses': len(new_courses),
+            'removed_courses': len(removed_courses),
+            'changed_courses': changed_courses,
+            'kept_courses': len(kept_courses),
+            'removed_rows': len(removed_exam_ids),
+            'added_rows': len(added),
+        },
+    })
+    statistics['unscheduled_courses'] = [name for name in statistics.get('unscheduled_courses', [])
+                                         if name not in kept_courses]
+    statistics['kept_courses'] = kept_courses
+
+    if success:
+        message = (f"Program onarıldı: {changed_courses} dersin sınavı değişti "
+                   f"({len(removed_exam_ids)} satır silindi, {len(added)} satır eklendi).")
+    else:
+        message = (f"Kısmi onarım: {scheduled_courses}/{len(courses_by_id)} ders planlı. "
+                   f"{len(kept_courses)} ders yeni yer bulunamadığı için eski yerinde bırakıldı, "
+                   f"{len(statistics['unscheduled_courses'])} ders yerleştirilemedi.")
+
+    return (
+        ScheduleResult(success=success, message=message, exams=fixed + kept + new_exams, statistics=statistics),
+        ScheduleDiff(removed_exam_ids=removed_exam_ids, added=added)
+    )
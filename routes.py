@@ -3,6 +3,7 @@
 Bu dosya tüm web sayfası yönlendirmelerini ve iş mantığını içerir.
 """
 
+import json
 from datetime import date
 
 from flask import (
@@ -14,13 +15,28 @@ from flask import (
     flash,
     session,
     jsonify,
+    current_app,
+    Response,
+    stream_with_context,
 )
 from sqlalchemy.orm import joinedload
 from werkzeug.security import check_password_hash
 
 from app import db
-from models import Course, Classroom, Exam, User, Role, InstructorAvailability, Student, StudentCourse, ClassroomProximity
-from scheduler import generate_exam_schedule
+from models import (
+    Course, Classroom, Exam, User, Role, InstructorAvailability, Student, StudentCourse, ClassroomProximity,
+    SchedulerJob, ScheduleVersion
+)
+from scheduler import ScheduleResult, load_snapshot
+from repair import repair_exam_schedule
+from schedule_cache import result_cache, invalidate_schedule_cache
+from schedule_store import (
+    save_schedule, save_repair, active_exams, active_version, activate_version, delete_version, diff_versions,
+    is_worse_than_active
+)
+from jobs import (
+    load_scheduler_input, solve_schedule, start_scheduler_job, active_scheduler_job, close_stale_job, job_events
+)
 from excel_importer import ExcelImporter
 
 # Ana blueprint (yönlendirme grubu) oluştur
@@ -219,6 +235,7 @@ def create_course():
         )
         db.session.add(course)
         db.session.commit()
+        invalidate_schedule_cache()
         flash("Ders başarıyla eklendi.", "success")
         return redirect(url_for("main.list_courses"))
 
@@ -256,6 +273,7 @@ def edit_course(course_id: int):
         course.special_case = request.form.get("special_case") or None
 
         db.session.commit()
+        invalidate_schedule_cache()
         flash("Ders güncellendi.", "success")
         return redirect(url_for("main.list_courses"))
 
@@ -280,6 +298,7 @@ def delete_course(course_id: int):
 
     db.session.delete(course)
     db.session.commit()
+    invalidate_schedule_cache()
     flash("Ders silindi.", "info")
     return redirect(url_for("main.list_courses"))
 
@@ -360,6 +379,7 @@ def create_classroom():
         )
         db.session.add(classroom)
         db.session.commit()
+        invalidate_schedule_cache()
         flash("Derslik başarıyla eklendi.", "success")
         return redirect(url_for("main.list_classrooms"))
 
@@ -387,6 +407,7 @@ def edit_classroom(classroom_id: int):
         classroom.exam_allowed = request.form.get("exam_allowed") == "on"
         
         db.session.commit()
+        invalidate_schedule_cache()
         flash("Derslik güncellendi.", "success")
         return redirect(url_for("main.list_classrooms"))
 
@@ -398,10 +419,11 @@ def edit_classroom(classroom_id: int):
 def delete_classroom(classroom_id: int):
     classroom = Classroom.query.get_or_404(classroom_id)
     
-    # Önce bu derslikle ilgili sınavları kontrol et
+    # Önce bu derslikle ilgili sınavları kontrol et (eski program sürümleri dahil)
     exam_count = Exam.query.filter_by(classroom_id=classroom_id).count()
     if exam_count > 0:
-        flash(f"Bu derslik {exam_count} sınavda kullanılıyor. Önce sınavları temizleyin.", "warning")
+        flash(f"Bu derslik {exam_count} sınav satırında (tüm program sürümleri) kullanılıyor. "
+              f"Önce sınavları temizleyin ve eski sürümleri silin.", "warning")
         return redirect(url_for("main.list_classrooms"))
     
     # Yakınlık verilerini temizle
@@ -413,6 +435,7 @@ def delete_classroom(classroom_id: int):
     # Dersliği sil
     db.session.delete(classroom)
     db.session.commit()
+    invalidate_schedule_cache()
     flash(f"Derslik '{classroom.name}' silindi.", "info")
     return redirect(url_for("main.list_classrooms"))
 
@@ -437,6 +460,7 @@ def manage_instructor_availability():
         )
         db.session.add(availability)
         db.session.commit()
+        invalidate_schedule_cache()
         flash("Müsaitlik bilgisi eklendi.", "success")
         return redirect(url_for("main.manage_instructor_availability"))
 
@@ -460,7 +484,7 @@ def list_exams():
     department = request.args.get("department")
     day = request.args.get("day")
 
-    query = Exam.query.join(Course).join(Classroom).distinct()
+    query = active_exams().join(Course).join(Classroom).distinct()
 
     # Varsayılan olarak: bölüm yetkilisi / hoca / öğrenci kendi fakülte-bölümünü görsün
     # Admin tüm sınavları görebilir
@@ -540,6 +564,8 @@ def import_excel():
                   f"Yakınlık ilişkileri: {results['classroom_proximity']}", "success")
         except Exception as e:
             flash(f"Import hatası: {str(e)}", "danger")
+        # Yarım kalan bir import da veriyi değiştirmiş olabilir
+        invalidate_schedule_cache()
         
         return redirect(url_for("main.import_excel"))
     
@@ -559,7 +585,7 @@ def my_schedule():
         course_ids = [sc.course_id for sc in student_courses]
         
         if course_ids:
-            exams = (Exam.query
+            exams = (active_exams()
                     .join(Course)
                     .join(Classroom)
                     .filter(Course.id.in_(course_ids))
@@ -568,7 +594,7 @@ def my_schedule():
     
     elif user.is_instructor() and user.instructor_name:
         # Hoca için: Verdiği derslerin sınavları
-        exams = (Exam.query
+        exams = (active_exams()
                 .join(Course)
                 .join(Classroom)
                 .filter(Course.instructor == user.instructor_name)
@@ -582,8 +608,25 @@ def my_schedule():
 @login_required(roles=[Role.ADMIN])
 def run_scheduler():
     """Gelişmiş otomatik planlama tetikleme endpoint'i."""
-    all_courses = Course.query.filter_by(has_exam=True).all()
-    all_classrooms = Classroom.query.filter_by(exam_allowed=True).all()
+    # Arka plan modunda arama ayrı süreçte çalışır, istek hemen döner
+    if current_app.config.get("SCHEDULER_BACKGROUND"):
+        running = active_scheduler_job()
+        if running is not None:
+            flash(f"Zaten çalışan bir planlama işi var (iş #{running.id}).", "warning")
+            return redirect(url_for("main.index"))
+        job = start_scheduler_job()
+        if job.is_active():
+            flash(f"Planlama arka planda başlatıldı (iş #{job.id}). Durum: "
+                  f"{url_for('main.scheduler_job_status', job_id=job.id)}", "info")
+            return redirect(url_for("main.index"))
+        flash(job.message, "success")
+        return redirect(url_for("main.list_exams"))
+
+    # Girdi ORM nesnesi oluşturmadan, sütun sorgularıyla tek seferde okunur;
+    # sabitlenmiş sınavlar yerinde kalır, planlayıcı bunların etrafına yerleştirir
+    scheduler_input = load_scheduler_input(current_app.config)
+    all_courses = scheduler_input.snapshot.courses
+    all_classrooms = scheduler_input.snapshot.classrooms
 
     # Debug: Kaç derslik bulundu?
     print(f"DEBUG: {len(all_classrooms)} derslik bulundu:")
@@ -594,53 +637,238 @@ def run_scheduler():
     for course in all_courses:
         print(f"  - {course.name} (öğrenci: {course.student_count})")
 
-    # Gelişmiş scheduler'ı çağır
-    schedule = generate_exam_schedule(all_courses, all_classrooms, days=10)
+    # Aynı girdiyle (veriler, ayarlar, sabit sınavlar, başlangıç günü) daha önce başarıyla
+    # çözüldüyse arama yapılmaz, sonuç önbellekten döner
+    schedule = result_cache.get(scheduler_input.fingerprint)
+    from_cache = schedule is not None
 
-    if not schedule.success:
+    # Gelişmiş scheduler'ı çağır (ayarlara göre bileşenlere ayrıştırarak veya paralel portföy modunda)
+    if from_cache:
+        print(f"SCHEDULER: Girdi değişmemiş ({scheduler_input.fingerprint[:12]}), sonuç önbellekten alındı")
+    else:
+        schedule = solve_schedule(scheduler_input)
+        result_cache.put(scheduler_input.fingerprint, schedule)
+
+    # Kısmi sonuç da kaydedilir; hiç sınav yerleşmediyse eski program korunur
+    if not schedule.exams:
         flash("Planlama başarısız: " + schedule.message, "danger")
         return redirect(url_for("main.index"))
+    # Yayındaki programdan daha az ders yerleştiren kısmi sonuç onun yerine geçmez
+    if is_worse_than_active(schedule):
+        stats = schedule.statistics
+        flash(f"Kısmi sonuç ({stats['scheduled_courses']}/{stats['total_courses']} ders) yayındaki programdan "
+              f"daha az ders yerleştirdiği için kaydedilmedi; mevcut program korundu. {schedule.message}", "warning")
+        return redirect(url_for("main.index"))
 
-    # Eski sınavları temizle
-    Exam.query.delete()
-
-    # Yeni sınavları ekle
-    for exam_info in schedule.exams:
-        exam = Exam(
-            course_id=exam_info.course_id,
-            classroom_id=exam_info.classroom_id,
-            date=exam_info.date,
-            start_time=exam_info.start_time,
-            end_time=exam_info.end_time,
-            exam_group_id=exam_info.exam_group_id
-        )
-        db.session.add(exam)
-
-    db.session.commit()
+    # Yeni program yeni sürüm olarak yazılır (sabitlenmiş sınavlar taşınır) ve yayına alınır
+    version = save_schedule(schedule)
     
     # İstatistikleri flash mesajında göster
     stats = schedule.statistics
-    flash(f"Sınav programı oluşturuldu! {stats['scheduled_courses']}/{stats['total_courses']} ders planlandı. "
-          f"{stats['total_classrooms_used']} derslik kullanıldı.", "success")
+    flash(f"Sınav programı oluşturuldu (sürüm #{version.id})! {stats['scheduled_courses']}/{stats['total_courses']} "
+          f"ders planlandı. {stats['total_classrooms_used']} derslik kullanıldı.", "success")
+    if scheduler_input.fixed_assignments:
+        flash(f"{len({a.course_id for a in scheduler_input.fixed_assignments})} dersin sabitlenmiş sınavı "
+              f"yerinde bırakıldı.", "info")
+    if from_cache:
+        flash("Planlama girdileri son çalıştırmadan beri değişmediği için önceki sonuç kullanıldı.", "info")
     
-    if stats['failed_courses']:
-        flash(f"Planlanamayan dersler: {', '.join(stats['failed_courses'])}", "warning")
+    if not schedule.success:
+        flash(schedule.message, "warning")
+    if stats['unscheduled_courses']:
+        flash(f"Planlanamayan dersler: {', '.join(stats['unscheduled_courses'])}", "warning")
     
     return redirect(url_for("main.list_exams"))
     flash("Sınav programı başarıyla oluşturuldu.", "success")
     return redirect(url_for("main.list_exams"))
 
 
+@main_bp.route("/admin/scheduler_jobs", methods=["POST"])
+@login_required(roles=[Role.ADMIN])
+def create_scheduler_job():
+    """Planlamayı arka planda başlatır; iş bilgisini ve durum adresini JSON olarak döner."""
+    running = active_scheduler_job()
+    if running is not None:
+        return jsonify({"error": "Zaten çalışan bir planlama işi var.", "job": running.to_dict()}), 409
+    job = start_scheduler_job()
+    return jsonify({
+        "job": job.to_dict(),
+        "status_url": url_for("main.scheduler_job_status", job_id=job.id),
+        "cancel_url": url_for("main.cancel_scheduler_job", job_id=job.id),
+    }), 202
+
+
+@main_bp.route("/admin/scheduler_jobs/<int:job_id>")
+@login_required(roles=[Role.ADMIN])
+def scheduler_job_status(job_id):
+    """Planlama işinin durumu ve ilerlemesi (yönetici sayfası bu adresi yoklar)."""
+    job = SchedulerJob.query.get_or_404(job_id)
+    close_stale_job(job)
+    return jsonify(job.to_dict())
+
+
+@main_bp.route("/admin/run_scheduler/stream")
+@login_required(roles=[Role.ADMIN])
+def scheduler_progress_stream():
+    """
+    Planlama işinin canlı ilerlemesi (Server-Sent Events); job_id verilmezse çalışan iş izlenir.
+    'progress' olayları: ders derinliği, en iyi kısmi atama, düğüm/sn, önbellek isabet oranı;
+    iş bitince 'done' olayı işin son durumuyla gelir. Erken durdurmak için iptal endpoint'i kullanılır.
+    """
+    job_id = request.args.get("job_id", type=int)
+    job = SchedulerJob.query.get_or_404(job_id) if job_id is not None else active_scheduler_job()
+    if job is None:
+        return jsonify({"error": "Çalışan bir planlama işi yok."}), 404
+
+    def generate():
+        for event, data in job_events(job):
+            if data is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@main_bp.route("/admin/scheduler_jobs/<int:job_id>/cancel", methods=["POST"])
+@login_required(roles=[Role.ADMIN])
+def cancel_scheduler_job(job_id):
+    """Çalışan planlama işinin iptalini ister; süreç bir sonraki kontrolde durur, sonuç yazılmaz."""
+    job = SchedulerJob.query.get_or_404(job_id)
+    if not job.is_active():
+        return jsonify({"error": "İş zaten tamamlanmış.", "job": job.to_dict()}), 409
+    job.cancel_requested = True
+    db.session.commit()
+    return jsonify(job.to_dict()), 202
+
+
+@main_bp.route("/admin/repair_schedule", methods=["POST"])
+@login_required(roles=[Role.ADMIN])
+def repair_schedule():
+    """Mevcut programı silmeden onarır: yalnızca etkilenen sınavlar yeniden planlanır."""
+    snapshot = load_snapshot()
+    existing_exams = active_exams().all()
+
+    if not existing_exams:
+        flash("Onarılacak bir sınav programı yok, önce otomatik planlamayı çalıştırın.", "warning")
+        return redirect(url_for("main.index"))
+
+    schedule, diff = repair_exam_schedule(
+        list(snapshot.courses),
+        list(snapshot.classrooms),
+        existing_exams,
+        days=10,
+        ordering=current_app.config.get("SCHEDULER_ORDERING", "domain"),
+        time_limit=current_app.config.get("SCHEDULER_TIME_LIMIT"),
+        snapshot=snapshot,
+    )
+
+    # Çözücü hiçbir şey üretemediyse (fizibilite hatası) yayındaki program olduğu gibi kalır
+    fatal_issues = [issue['message'] for issue in schedule.statistics.get('feasibility', []) if issue['fatal']]
+    if fatal_issues or not schedule.exams:
+        flash("Onarım başarısız, mevcut program değiştirilmedi: " + (" ".join(fatal_issues) or schedule.message),
+              "danger")
+        return redirect(url_for("main.list_exams"))
+    if not diff.added and not diff.removed_exam_ids:
+        flash("Programda onarılacak bir değişiklik bulunamadı.", "info")
+        return redirect(url_for("main.list_exams"))
+
+    # Yeni sürüm: değişmeyen satırlar veritabanında taşınır, yalnızca fark eklenir
+    save_repair(schedule, diff)
+
+    flash(schedule.message, "success" if schedule.success else "warning")
+    if schedule.statistics['kept_courses']:
+        flash(f"Yeni yeri bulunamayıp eski yerinde bırakılan dersler: {', '.join(schedule.statistics['kept_courses'])}",
+              "warning")
+    if schedule.statistics['unscheduled_courses']:
+        flash(f"Planlanamayan dersler: {', '.join(schedule.statistics['unscheduled_courses'])}", "warning")
+
+    return redirect(url_for("main.list_exams"))
+
+
 @main_bp.route("/admin/clear_schedule", methods=["POST"])
 @login_required(roles=[Role.ADMIN])
 def clear_schedule():
-    """Tüm sınav programını temizler (yeniden planlama öncesi veya sıfırlama için)."""
-    Exam.query.delete()
+    """
+    Tüm sınav programını temizler (yeniden planlama öncesi veya sıfırlama için); sabit sınavlar kalır.
+    Temizlik de yeni (boş) bir sürümdür; önceki program sürümler arasından geri alınabilir.
+    """
+    version = save_schedule(
+        ScheduleResult(success=True, message="Program temizlendi.", exams=[], statistics={}), source="clear"
+    )
+    pinned_count = version.row_count
+    if pinned_count:
+        flash(f"Sınav programı temizlendi. {pinned_count} sabitlenmiş sınav satırı korundu.", "info")
+    else:
+        flash("Tüm sınav programı temizlendi.", "info")
+    return redirect(url_for("main.list_exams"))
+
+
+@main_bp.route("/admin/exams/<int:exam_id>/toggle_pin", methods=["POST"])
+@login_required(roles=[Role.ADMIN])
+def toggle_exam_pin(exam_id):
+    """Bir sınavı (tüm derslik satırlarıyla) sabitler veya sabitlemeyi kaldırır."""
+    exam = Exam.query.get_or_404(exam_id)
+    pinned = not exam.is_pinned
+    if exam.exam_group_id:
+        rows = Exam.query.filter_by(exam_group_id=exam.exam_group_id, version_id=exam.version_id).all()
+    else:
+        rows = [exam]
+    for row in rows:
+        row.is_pinned = pinned
     db.session.commit()
-    flash("Tüm sınav programı temizlendi.", "info")
+
+    if pinned:
+        flash(f"{exam.course.name} sınavı sabitlendi; yeniden planlamada yerinde kalacak.", "success")
+    else:
+        flash(f"{exam.course.name} sınavının sabitlemesi kaldırıldı.", "info")
     return redirect(url_for("main.list_exams"))
 
 
+@main_bp.route("/admin/schedule_versions")
+@login_required(roles=[Role.ADMIN])
+def list_schedule_versions():
+    """Kaydedilmiş program sürümleri (en yenisi önce) JSON olarak."""
+    versions = ScheduleVersion.query.order_by(ScheduleVersion.id.desc()).all()
+    return jsonify([version.to_dict() for version in versions])
+
+
+@main_bp.route("/admin/schedule_versions/<int:version_id>/activate", methods=["POST"])
+@login_required(roles=[Role.ADMIN])
+def activate_schedule_version(version_id):
+    """Eski bir program sürümünü yeniden hesaplamadan yayına alır."""
+    version = ScheduleVersion.query.get_or_404(version_id)
+    activate_version(version)
+    return jsonify(version.to_dict())
+
+
+@main_bp.route("/admin/schedule_versions/<int:version_id>/delete", methods=["POST"])
+@login_required(roles=[Role.ADMIN])
+def delete_schedule_version(version_id):
+    """Yayında olmayan bir program sürümünü satırlarıyla siler."""
+    version = ScheduleVersion.query.get_or_404(version_id)
+    if version.is_active:
+        return jsonify({"error": "Yayındaki sürüm silinemez; önce başka bir sürümü yayına alın."}), 409
+    delete_version(version)
+    return jsonify({"deleted": version_id})
+
+
+@main_bp.route("/admin/schedule_versions/diff")
+@login_required(roles=[Role.ADMIN])
+def diff_schedule_versions():
+    """
+    İki sürümün farkı: saati değişen sınavlar, derslik değişiklikleri ve etkilenen öğrenci sayısı.
+    ?from=<id>&to=<id>; to verilmezse yayındaki sürüm kullanılır.
+    """
+    old_version = ScheduleVersion.query.get_or_404(request.args.get("from", type=int))
+    new_version_id = request.args.get("to", type=int)
+    new_version = ScheduleVersion.query.get_or_404(new_version_id) if new_version_id is not None else active_version()
+    if new_version is None:
+        return jsonify({"error": "Yayında bir program sürümü yok."}), 404
+    return jsonify(diff_versions(old_version.id, new_version.id))
+
+
 @main_bp.route("/exams/export/csv")
 @login_required(
     roles=[Role.ADMIN, Role.DEPARTMENT_OFFICER, Role.INSTRUCTOR, Role.STUDENT]
@@ -655,7 +883,7 @@ def export_exams_csv():
     department = request.args.get("department")
     day = request.args.get("day")
 
-    query = Exam.query.join(Course).join(Classroom).distinct()
+    query = active_exams().join(Course).join(Classroom).distinct()
     if faculty:
         query = query.filter(Course.faculty == faculty)
     if department:
@@ -745,7 +973,7 @@ def export_exams_pdf():
     day = request.args.get("day")
 
     # Veritabanı sorgusu
-    query = Exam.query.join(Course).join(Classroom).distinct()
+    query = active_exams().join(Course).join(Classroom).distinct()
     if faculty:
         query = query.filter(Course.faculty == faculty)
     if department:
@@ -0,0 +1,89 @@
+"""
+Planlama Girdisi Parmak İzi ve Sonuç Önbelleği
+
+Yönetici veriler değişmeden planlamayı tekrar çalıştırdığında tüm arama baştan yapılmasın diye
+girdinin tamamından (sınavı olan dersler, sınava uygun derslikler, öğrenci-ders kayıtları,
+yakınlık, hoca müsaitliği, gün sayısı, başlangıç tarihi, sabit sınavlar ve planlayıcı ayarları)
+kararlı bir SHA-256 özeti hesaplanır. Başarılı sonuçlar bu özetle, boyutu sınırlı bir LRU
+önbellekte tutulur; aynı istek aramaya girmeden önbellekten döner.
+Önbellek süreç içidir; veri içe aktarma ve düzenleme işlemleri invalidate_schedule_cache() çağırır.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+from collections import OrderedDict
+from datetime import date
+from typing import List, Dict, Optional
+
+from scheduler import ExamAssignment, ScheduleResult, SchedulingSnapshot
+
+# Önbellekte tutulan en fazla sonuç sayısı (en eski kullanılan atılır)
+RESULT_CACHE_SIZE = 8
+
+
+def input_fingerprint(snapshot: SchedulingSnapshot, days: int, start_date: date,
+                      fixed_assignments: Optional[List[ExamAssignment]] = None, **options) -> str:
+    """
+    Planlama girdisinin sıradan bağımsız özeti
+    options: sonucu etkileyen planlayıcı ayarları (mod, sıralama, süre sınırları ...)
+    """
+    digest = hashlib.sha256()
+
+    def feed(label: str, rows):
+        digest.update(label.encode())
+        for row in sorted(repr(r) for r in rows):
+            digest.update(row.encode())
+            digest.update(b"\n")
+
+    feed("courses", (c for c in snapshot.courses if c.has_exam))
+    feed("classrooms", (cl for cl in snapshot.classrooms if cl.exam_allowed))
+    feed("enrollments", snapshot.enrollments)
+    feed("proximities", snapshot.proximities)
+    feed("availabilities", snapshot.availabilities)
+    feed("fixed", ((a.course_id, a.classroom_id, a.date, a.start_time, a.end_time)
+                   for a in fixed_assignments or []))
+    feed("options", [("days", days), ("start_date", start_date)] + sorted(options.items()))
+    return digest.hexdigest()
+
+
+class ScheduleResultCache:
+    """Parmak izi -> ScheduleResult, boyutu sınırlı LRU önbellek"""
+
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self.results: OrderedDict = OrderedDict()
+        self.statistics: Dict[str, int] = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, fingerprint: str) -> Optional[ScheduleResult]:
+        result = self.results.get(fingerprint)
+        if result is None:
+            self.statistics['misses'] += 1
+            return None
+        self.results.move_to_end(fingerprint)
+        self.statistics['hits'] += 1
+        # Çağıran sonucu değiştirebilir (grup kimliği, istatistik); önbellekteki kopya korunur
+        return copy.deepcopy(result)
+
+    def put(self, fingerprint: str, result: ScheduleResult):
+        """Yalnızca başarılı sonuçlar saklanır (kısmi sonuçlar bir sonraki denemede iyileşebilir)"""
+        if not result.success:
+            return
+        self.results[fingerprint] = copy.deepcopy(result)
+        self.results.move_to_end(fingerprint)
+        while len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        self.results.clear()
+        self.statistics['invalidations'] += 1
+
+
+# Süreç genelindeki önbellek
+result_cache = ScheduleResultCache()
+
+
+def invalidate_schedule_cache():
+    """Planlama girdisi değişti (içe aktarma / düzenleme): önbellekteki tüm sonuçları at"""
+    result_cache.clear()
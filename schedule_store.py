@@ -0,0 +1,241 @@
+"""
+Sınav Programı Sürümleri: Toplu Kayıt, Anında Geri Dönüş ve Fark
+
+Her planlama, onarım ve temizleme exams tablosunun üzerine yazmak yerine yeni bir sürüm açar:
+- Yeni sürümün satırları toplu (executemany, BATCH_SIZE'lık gruplar) eklenir; önceki sürümden
+  taşınan satırlar (sabitlenmiş sınavlar, onarımda değişmeyenler) INSERT ... SELECT ile
+  veritabanı içinde kopyalanır
+- Satırlar yazılırken okuyucular hâlâ aktif sürümü görür; aynı işlemde aktif bayrağı yeni sürüme
+  taşınır. /exams ve /my_schedule hiçbir an yarım program görmez
+- Eski bir sürümü yayına almak yalnızca aktif bayrağını taşır (O(1), satır kopyalanmaz)
+- İki sürümün farkı (saati değişen sınavlar, derslik değişiklikleri, etkilenen öğrenciler)
+  yalnızca anahtar sütunlar okunarak küme işlemleriyle hesaplanır
+Sürümleme öncesinden kalan (surum_id boş) satırlar ilk kayıtta 'legacy' sürümüne bağlanır.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import func, literal, select, true
+
+from app import db
+from models import Exam, ScheduleVersion, StudentCourse
+from repair import ScheduleDiff
+from scheduler import ExamAssignment, ScheduleResult
+
+# Tek bir executemany çağrısıyla yazılan en fazla satır
+BATCH_SIZE = 1000
+
+
+def _exam_rows(assignments: List[ExamAssignment], version_id: int) -> List[Dict]:
+    """Atamalar -> exams tablosu satırları (anahtarlar veritabanı sütun adlarıdır, ör. sinav_grup_id)"""
+    column = {attr: Exam.__mapper__.columns[attr].key
+              for attr in ('course_id', 'classroom_id', 'date', 'start_time', 'end_time', 'exam_group_id',
+                           'is_pinned', 'version_id')}
+    return [
+        {
+            column['course_id']: a.course_id,
+            column['classroom_id']: a.classroom_id,
+            column['date']: a.date,
+            column['start_time']: a.start_time,
+            column['end_time']: a.end_time,
+            column['exam_group_id']: a.exam_group_id,
+            column['is_pinned']: False,
+            column['version_id']: version_id,
+        }
+        for a in assignments
+    ]
+
+
+def _batches(rows: List[Dict]) -> Iterator[List[Dict]]:
+    for i in range(0, len(rows), BATCH_SIZE):
+        yield rows[i:i + BATCH_SIZE]
+
+
+def active_version() -> Optional[ScheduleVersion]:
+    return ScheduleVersion.query.filter_by(is_active=True).first()
+
+
+def active_exams():
+    """Yayındaki programın satırları için sorgu (henüz sürüm yoksa sürümsüz satırlar)"""
+    version = active_version()
+    if version is None:
+        return Exam.query.filter(Exam.version_id.is_(None))
+    return Exam.query.filter(Exam.version_id == version.id)
+
+
+def is_worse_than_active(schedule: ScheduleResult) -> bool:
+    """
+    Kısmi sonuç (sabitlenmiş sınavlar dahil) yayındaki programdan daha az ders yerleştiriyorsa True;
+    böyle bir sonuç yayındaki programın yerine geçmez
+    """
+    if schedule.success:
+        return False
+    rows = active_exams().with_entities(Exam.course_id, Exam.is_pinned).distinct().all()
+    active_courses = {course_id for course_id, _ in rows}
+    pinned_courses = {course_id for course_id, is_pinned in rows if is_pinned}
+    return len({a.course_id for a in schedule.exams} | pinned_courses) < len(active_courses)
+
+
+def _activate(version: ScheduleVersion):
+    """Aktif bayrağını bu sürüme taşı (en fazla iki satır güncellenir); commit çağırana aittir"""
+    ScheduleVersion.query.filter(
+        ScheduleVersion.is_active.is_(True), ScheduleVersion.id != version.id
+    ).update({ScheduleVersion.is_active: False}, synchronize_session=False)
+    version.is_active = True
+    version.activated_at = datetime.utcnow()
+
+
+def _adopt_legacy_rows() -> Optional[ScheduleVersion]:
+    """Aktif sürüm yoksa sürümsüz satırları 'legacy' sürümüne bağla; eski programa da dönülebilsin"""
+    version = active_version()
+    if version is not None:
+        return version
+    row_count = Exam.query.filter(Exam.version_id.is_(None)).count()
+    if not row_count:
+        return None
+    version = ScheduleVersion(source="legacy", message="Sürümleme öncesi program", row_count=row_count)
+    db.session.add(version)
+    db.session.flush()
+    Exam.query.filter(Exam.version_id.is_(None)).update({Exam.version_id: version.id}, synchronize_session=False)
+    _activate(version)
+    return version
+
+
+def _stored_statistics(schedule: ScheduleResult) -> str:
+    """Sürümle saklanan istatistikler; ders başına başarısızlık sayıları yalnızca toplam olarak tutulur"""
+    statistics = dict(schedule.statistics)
+    failed_courses = statistics.pop('failed_courses', None)
+    if failed_courses is not None:
+        statistics['failed_course_count'] = len(failed_courses)
+    return json.dumps(statistics, default=str)
+
+
+def _create_version(schedule: ScheduleResult, source: str, carried, added: List[ExamAssignment]) -> ScheduleVersion:
+    """
+    Yeni sürüm: aktif sürümün carried koşulunu sağlayan satırları + yeni satırlar;
+    tek işlemde yazılır ve yayına alınır
+    """
+    previous = _adopt_legacy_rows()
+    version = ScheduleVersion(source=source, message=schedule.message,
+                              statistics=_stored_statistics(schedule))
+    db.session.add(version)
+    db.session.flush()
+
+    exam_table = Exam.__table__
+    version_column = Exam.__mapper__.columns['version_id']
+    carried_count = 0
+    if previous is not None:
+        columns = [c for c in exam_table.columns if c is not version_column and not c.primary_key]
+        rows = select(*columns, literal(version.id)).where(Exam.version_id == previous.id, carried)
+        result = db.session.execute(
+            exam_table.insert().from_select([c.name for c in columns] + [version_column.name], rows)
+        )
+        carried_count = result.rowcount
+
+    rows = _exam_rows(added, version.id)
+    for batch in _batches(rows):
+        db.session.execute(exam_table.insert(), batch)
+
+    version.row_count = carried_count + len(rows)
+    _activate(version)
+    db.session.commit()
+    print(f"SCHEDULE_STORE: Sürüm #{version.id} ({source}) yayında: {carried_count} satır taşındı, "
+          f"{len(rows)} satır eklendi")
+    return version
+
+
+def save_schedule(schedule: ScheduleResult, source: str = "run") -> ScheduleVersion:
+    """Yeni programı yeni sürüm olarak kaydet; sabitlenmiş sınavlar aktif sürümden taşınır"""
+    return _create_version(schedule, source, Exam.is_pinned.is_(True), schedule.exams)
+
+
+def save_repair(schedule: ScheduleResult, diff: ScheduleDiff) -> ScheduleVersion:
+    """Onarımı yeni sürüm olarak kaydet: aktif sürümün değişmeyen satırları taşınır, fark eklenir"""
+    carried = Exam.id.notin_(diff.removed_exam_ids) if diff.removed_exam_ids else true()
+    return _create_version(schedule, "repair", carried, diff.added)
+
+
+def activate_version(version: ScheduleVersion):
+    """Eski bir sürümü yayına al; satırlara dokunulmaz"""
+    _activate(version)
+    db.session.commit()
+
+
+def delete_version(version: ScheduleVersion):
+    """Aktif olmayan bir sürümü satırlarıyla birlikte sil"""
+    Exam.query.filter(Exam.version_id == version.id).delete(synchronize_session=False)
+    db.session.delete(version)
+    db.session.commit()
+
+
+def _version_keys(version_id: int):
+    """Sürümün anahtar kümeleri: (ders, tarih, başlangıç, bitiş) oturumları ve (ders, derslik) çiftleri"""
+    rows = (db.session.query(Exam.course_id, Exam.classroom_id, Exam.date, Exam.start_time, Exam.end_time)
+            .filter(Exam.version_id == version_id)
+            .all())
+    sittings = {(course_id, exam_date, start, end) for course_id, _, exam_date, start, end in rows}
+    rooms = {(course_id, classroom_id) for course_id, classroom_id, _, _, _ in rows}
+    return sittings, rooms
+
+
+def _sitting_dict(sitting) -> Dict:
+    exam_date, start, end = sitting
+    return {"date": exam_date.isoformat(), "start_time": start.strftime("%H:%M"), "end_time": end.strftime("%H:%M")}
+
+
+def diff_versions(old_version_id: int, new_version_id: int) -> Dict:
+    """
+    İki sürümün farkı; satırlar değil yalnızca anahtar kümeleri karşılaştırılır
+    moved: saati/günü değişen dersler, room_changes: dersliği değişen dersler,
+    affected_students: değişen, eklenen veya çıkarılan bir dersi alan öğrenci sayısı
+    """
+    old_sittings, old_rooms = _version_keys(old_version_id)
+    new_sittings, new_rooms = _version_keys(new_version_id)
+    old_courses = {key[0] for key in old_sittings}
+    new_courses = {key[0] for key in new_sittings}
+    common = old_courses & new_courses
+
+    moved = {key[0] for key in old_sittings ^ new_sittings} & common
+    removed_rooms: Dict[int, List[int]] = {}
+    added_rooms: Dict[int, List[int]] = {}
+    for course_id, classroom_id in old_rooms - new_rooms:
+        if course_id in common:
+            removed_rooms.setdefault(course_id, []).append(classroom_id)
+    for course_id, classroom_id in new_rooms - old_rooms:
+        if course_id in common:
+            added_rooms.setdefault(course_id, []).append(classroom_id)
+    room_changed = set(removed_rooms) | set(added_rooms)
+    added_courses = new_courses - old_courses
+    removed_courses = old_courses - new_courses
+
+    changed = moved | room_changed | added_courses | removed_courses
+    affected_students = 0
+    if changed:
+        affected_students = (db.session.query(func.count(func.distinct(StudentCourse.student_no)))
+                             .filter(StudentCourse.course_id.in_(changed))
+                             .scalar())
+
+    old_times = {key[0]: key[1:] for key in old_sittings if key[0] in moved}
+    new_times = {key[0]: key[1:] for key in new_sittings if key[0] in moved}
+    return {
+        "from_version": old_version_id,
+        "to_version": new_version_id,
+        "moved": [
+            {"course_id": course_id, "from": _sitting_dict(old_times[course_id]),
+             "to": _sitting_dict(new_times[course_id])}
+            for course_id in sorted(moved)
+        ],
+        "room_changes": [
+            {"course_id": course_id, "removed_classrooms": sorted(removed_rooms.get(course_id, [])),
+             "added_classrooms": sorted(added_rooms.get(course_id, []))}
+            for course_id in sorted(room_changed)
+        ],
+        "added_courses": sorted(added_courses),
+        "removed_courses": sorted(removed_courses),
+        "unchanged_courses": len(common - moved - room_changed),
+        "affected_students": affected_students,
+    }
@@ -11,15 +11,42 @@ Bu algoritma şu özellikleri destekler:
 
 from __future__ import annotations
 
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import date, time, timedelta
-from typing import List, Dict, Tuple, Optional, Set
+from functools import partial
+from typing import List, Dict, Tuple, Optional, Set, Callable
+from bisect import bisect_left
+from time import perf_counter
+import random
 import uuid
 
-from models import Course, Classroom, InstructorAvailability, StudentCourse, ClassroomProximity
+from models import Course, Classroom, InstructorAvailability, StudentCourse, ClassroomProximity, Exam
 from app import db
 
 
+# Backtracking'de sıradaki dersi seçme stratejileri
+# student_count: öğrenci sayısına göre sabit sıra (eski davranış)
+# degree: çakışma grafında en çok komşusu olan ders önce
+# dsatur: planlanmış komşularında en çok farklı (gün, başlangıç) bulunan ders önce
+# domain: kalan uygun (gün, başlangıç) sayısı en az olan ders önce
+ORDERING_STRATEGIES = ("student_count", "degree", "dsatur", "domain")
+
+# Derslik kombinasyonu önbelleğinin en fazla kayıt sayısı (en eski kullanılan atılır)
+COMBINATION_CACHE_SIZE = 4096
+
+# Bütçeli aramada aynı ders bu kadar kez başarısız olursa (sorumlusu olsa da) programdan çıkarılır;
+# tek bir zor ders aramayı köke yakın yerde geri atlamaya hapsetmesin
+DROP_AFTER_FAILURES = 1000
+
+# Aramanın bütçe dolmadan durma nedenleri ve sonuç mesajındaki karşılıkları
+STOP_REASONS = {
+    'time_limit': "Süre sınırına ulaşıldı.",
+    'node_limit': "Düğüm sınırına ulaşıldı.",
+    'cancelled': "Arama iptal edildi.",
+}
+
+
 @dataclass
 class ExamAssignment:
     course_id: int
@@ -30,6 +57,23 @@ class ExamAssignment:
     exam_group_id: str  # Aynı sınavın farklı dersliklerini gruplar
 
 
+class ExamGroup:
+    """
+    Arama içindeki sınav kaydı: bir oturum için tek nesne, derslikler id demeti olarak.
+    Zaman tamsayı ızgara konumudur; derslik başına ExamAssignment satırlarına
+    yalnızca sonuç üretilirken açılır (bkz. AdvancedScheduler._expand_groups)
+    """
+    __slots__ = ('course_id', 'day_offset', 'start_index', 'classroom_ids', 'exam_group_id')
+    
+    def __init__(self, course_id: int, day_offset: int, start_index: int, classroom_ids: Tuple[int, ...],
+                 exam_group_id: str):
+        self.course_id = course_id
+        self.day_offset = day_offset
+        self.start_index = start_index
+        self.classroom_ids = classroom_ids
+        self.exam_group_id = exam_group_id
+
+
 @dataclass
 class ScheduleResult:
     success: bool
@@ -38,33 +82,211 @@ class ScheduleResult:
     statistics: Dict[str, any]
 
 
+def exam_to_assignment(exam: Exam) -> ExamAssignment:
+    """Kayıtlı bir Exam satırını planlayıcının atama biçimine çevir (sabit / önceki sınavlar için)"""
+    return ExamAssignment(
+        course_id=exam.course_id,
+        classroom_id=exam.classroom_id,
+        date=exam.date,
+        start_time=exam.start_time,
+        end_time=exam.end_time,
+        exam_group_id=exam.exam_group_id
+    )
+
+
+# ORM'den bağımsız, pickle'lanabilir girdi kopyası. Planlayıcı her zaman bunun üzerinde çalışır:
+# ayrı süreçlere gönderilebilir, uygulama bağlamı ve tembel yükleme gerektirmez.
+# Alan adları Course / Classroom modelleriyle aynıdır.
+@dataclass(frozen=True)
+class CourseSnapshot:
+    id: int
+    code: str
+    name: str
+    department: str
+    faculty: str
+    instructor: str
+    student_count: int
+    exam_duration: int
+    has_exam: bool
+    requires_special_room: bool
+
+
+@dataclass(frozen=True)
+class ClassroomSnapshot:
+    id: int
+    name: str
+    capacity: int
+    exam_allowed: bool
+    room_type: Optional[str]
+    building: Optional[str]
+    floor: Optional[str]
+
+
+@dataclass(frozen=True)
+class SchedulingSnapshot:
+    courses: Tuple[CourseSnapshot, ...]
+    classrooms: Tuple[ClassroomSnapshot, ...]
+    enrollments: Tuple[Tuple[int, str], ...]  # (course_id, student_no)
+    proximities: Tuple[Tuple[int, int, float], ...]  # (classroom1_id, classroom2_id, distance_score)
+    availabilities: Tuple[Tuple[str, date, time, time], ...]  # (hoca, tarih, başlangıç, bitiş), yalnızca müsait olanlar
+
+
+def _relation_rows() -> Tuple[tuple, tuple, tuple]:
+    """Kayıt, yakınlık ve müsaitlik tablolarını yalnızca gereken sütunlarla, tablo başına tek sorguda oku"""
+    enrollments = tuple(
+        (course_id, student_no)
+        for course_id, student_no in db.session.query(StudentCourse.course_id, StudentCourse.student_no)
+    )
+    proximities = tuple(
+        (classroom1_id, classroom2_id, distance)
+        for classroom1_id, classroom2_id, distance in db.session.query(
+            ClassroomProximity.classroom1_id,
+            ClassroomProximity.classroom2_id,
+            ClassroomProximity.distance_score
+        )
+    )
+    availabilities = tuple(
+        (instructor_name, avail_date, start, end)
+        for instructor_name, avail_date, start, end in db.session.query(
+            InstructorAvailability.instructor_name,
+            InstructorAvailability.date,
+            InstructorAvailability.start_time,
+            InstructorAvailability.end_time
+        ).filter_by(is_available=True)
+    )
+    return enrollments, proximities, availabilities
+
+
+def load_snapshot() -> SchedulingSnapshot:
+    """
+    Planlama girdisini ORM nesnesi oluşturmadan, sütun sorgularıyla oku
+    (sınavı olan dersler, sınava uygun derslikler, kayıtlar, yakınlık, müsaitlik: 5 sorgu)
+    """
+    courses = tuple(
+        CourseSnapshot(*row) for row in db.session.query(
+            Course.id, Course.code, Course.name, Course.department, Course.faculty, Course.instructor,
+            Course.student_count, Course.exam_duration, Course.has_exam, Course.requires_special_room
+        ).filter(Course.has_exam.is_(True))
+    )
+    classrooms = tuple(
+        ClassroomSnapshot(*row) for row in db.session.query(
+            Classroom.id, Classroom.name, Classroom.capacity, Classroom.exam_allowed,
+            Classroom.room_type, Classroom.building, Classroom.floor
+        ).filter(Classroom.exam_allowed.is_(True))
+    )
+    enrollments, proximities, availabilities = _relation_rows()
+    return SchedulingSnapshot(
+        courses=courses,
+        classrooms=classrooms,
+        enrollments=enrollments,
+        proximities=proximities,
+        availabilities=availabilities
+    )
+
+
+def build_snapshot(courses: List[Course], classrooms: List[Classroom]) -> SchedulingSnapshot:
+    """Verilen ders ve derslikler (ORM nesneleri veya kopyaları) için planlama girdisini kopyala"""
+    enrollments, proximities, availabilities = _relation_rows()
+    return SchedulingSnapshot(
+        courses=tuple(
+            CourseSnapshot(
+                id=c.id, code=c.code, name=c.name, department=c.department, faculty=c.faculty,
+                instructor=c.instructor, student_count=c.student_count, exam_duration=c.exam_duration,
+                has_exam=c.has_exam, requires_special_room=c.requires_special_room
+            )
+            for c in courses
+        ),
+        classrooms=tuple(
+            ClassroomSnapshot(
+                id=cl.id, name=cl.name, capacity=cl.capacity, exam_allowed=cl.exam_allowed,
+                room_type=cl.room_type, building=cl.building, floor=cl.floor
+            )
+            for cl in classrooms
+        ),
+        enrollments=enrollments,
+        proximities=proximities,
+        availabilities=availabilities
+    )
+
+
 class AdvancedScheduler:
-    def __init__(self):
+    def __init__(self, snapshot: Optional[SchedulingSnapshot] = None):
+        self.snapshot = snapshot  # cache'lerin kurulduğu girdi kopyası (verilmezse generate_exam_schedule alır)
         self.student_course_cache: Dict[int, Set[str]] = {}  # course_id -> student_no_set
         self.classroom_proximity_cache: Dict[int, List[Tuple[int, float]]] = {}  # classroom_id -> [(nearby_id, distance)]
+        self.proximity_matrix: List[List[float]] = []  # [sıra][sıra] -> simetrik yakınlık (1 - distance), kayıt yoksa 0
+        self.classroom_max_closeness: List[float] = []  # sıra -> satırdaki en yüksek yakınlık, kombinasyon aramasında üst sınır
+        self.course_conflict_graph: Dict[int, Dict[int, int]] = {}  # course_id -> {çakışan_course_id: ortak_öğrenci_sayısı}
+        self.instructor_availability_index: Dict[Tuple[str, date], List[Tuple[int, int]]] = {}  # (hoca, tarih) -> [(başlangıç_dk, bitiş_dk)]
+        self.slot_minutes: int = 30
+        self.day_end_minute: int = 18 * 60
+        self.course_slot_counts: Dict[int, int] = {}  # course_id -> kapladığı slot sayısı
+        self.course_durations: Dict[int, int] = {}  # course_id -> sınav süresi (dk)
+        self.course_start_masks: Dict[int, List[int]] = {}  # course_id -> [gün] -> başlanabilir slot bit maskesi
+        # Tamsayı slot modeli: arama yalnızca (gün, başlangıç slotu, slot sayısı) ile çalışır,
+        # date / time nesnelerine sadece ExamAssignment çıktısı üretilirken çevrilir
+        self.day_dates: List[date] = []  # gün sırası -> tarih
+        self.slot_start_minutes: List[int] = []  # slot sırası -> gün içindeki başlangıç dakikası
+        self.end_times: Dict[int, List[time]] = {}  # süre (dk) -> [başlangıç slotu] -> bitiş saati
+        self.classroom_index: Dict[int, int] = {}  # classroom_id -> sıra (bit sırası / matris indeksi)
+        self.all_classrooms_mask: int = 0  # tüm dersliklerin bitleri
+        # (gerekli kapasite, özel mekan, boş derslik maskesi) -> seçilen derslikler (LRU)
+        self.combination_cache: OrderedDict = OrderedDict()
+        self.combination_cache_stats: Dict[str, int] = {'hits': 0, 'misses': 0}
+        self.room_occupancy: List[List[int]] = []  # [gün][slot] -> dolu derslik bit maskesi
+        self.fixed_intervals: List[Tuple[int, int, int, int]] = []  # sabit sınavlar: (gün, başlangıç, slot sayısı, derslik maskesi)
         
     def _build_student_course_cache(self):
         """Öğrenci-ders ilişkilerini cache'e al (performans için)"""
         print("Öğrenci-ders cache'i oluşturuluyor...")
         
-        student_courses = db.session.query(StudentCourse.course_id, StudentCourse.student_no).all()
-        
-        for course_id, student_no in student_courses:
+        for course_id, student_no in self.snapshot.enrollments:
             if course_id not in self.student_course_cache:
                 self.student_course_cache[course_id] = set()
             self.student_course_cache[course_id].add(student_no)
         
         print(f"✓ {len(self.student_course_cache)} ders için öğrenci cache'i hazır")
     
+    def _build_conflict_graph(self):
+        """
+        Ders x ders çakışma grafını öğrenci cache'inden bir kez oluştur
+        Her kenar ortak öğrenci sayısını tutar, çakışma kontrolü O(1) sözlük erişimine iner
+        """
+        print("Ders çakışma grafı oluşturuluyor...")
+        
+        # Öğrenci -> aldığı dersler (ters indeks)
+        courses_by_student: Dict[str, List[int]] = {}
+        for course_id, students in self.student_course_cache.items():
+            for student_no in students:
+                courses_by_student.setdefault(student_no, []).append(course_id)
+        
+        graph: Dict[int, Dict[int, int]] = {course_id: {} for course_id in self.student_course_cache}
+        for course_ids in courses_by_student.values():
+            for i, course1_id in enumerate(course_ids):
+                for course2_id in course_ids[i+1:]:
+                    graph[course1_id][course2_id] = graph[course1_id].get(course2_id, 0) + 1
+                    graph[course2_id][course1_id] = graph[course2_id].get(course1_id, 0) + 1
+        
+        self.course_conflict_graph = graph
+        edge_count = sum(len(neighbors) for neighbors in graph.values()) // 2
+        print(f"✓ {len(graph)} ders, {edge_count} çakışma kenarı içeren graf hazır")
+    
+    def _build_classroom_index(self, classrooms: List[Classroom]):
+        """Dersliklere sıkışık sıra numaraları ver (doluluk bitleri ve yakınlık matrisi için)"""
+        self.classroom_index = {cl.id: i for i, cl in enumerate(classrooms)}
+        self.all_classrooms_mask = (1 << len(classrooms)) - 1
+        # Sıralar değişti; önbellekteki maskeler artık başka dersliklere karşılık gelir
+        self.combination_cache.clear()
+        self.combination_cache_stats = {'hits': 0, 'misses': 0}
+    
     def _build_proximity_cache(self):
-        """Derslik yakınlık verilerini cache'e al"""
+        """
+        Derslik yakınlık verilerini cache'e al
+        Sıralı komşu listelerinin yanında derslik sıralarıyla indekslenen yoğun,
+        simetrik bir yakınlık matrisi kurulur; çift skoru tek indeks erişimidir
+        """
         print("Derslik yakınlık cache'i oluşturuluyor...")
-        
-        proximities = db.session.query(
-            ClassroomProximity.classroom1_id,
-            ClassroomProximity.classroom2_id,
-            ClassroomProximity.distance_score
-        ).all()
+        proximities = self.snapshot.proximities
         
         for classroom1_id, classroom2_id, distance in proximities:
             if classroom1_id not in self.classroom_proximity_cache:
@@ -75,60 +297,247 @@ class AdvancedScheduler:
         for classroom_id in self.classroom_proximity_cache:
             self.classroom_proximity_cache[classroom_id].sort(key=lambda x: x[1])
         
+        # Excel her satırda tek yön yazdığı için matris simetrikleştirilir (iki yönün en yakını)
+        room_count = len(self.classroom_index)
+        matrix = [[0.0] * room_count for _ in range(room_count)]
+        for classroom1_id, classroom2_id, distance in proximities:
+            i = self.classroom_index.get(classroom1_id)
+            j = self.classroom_index.get(classroom2_id)
+            if i is None or j is None or i == j:
+                continue
+            closeness = 1.0 - distance
+            if closeness > matrix[i][j]:
+                matrix[i][j] = closeness
+                matrix[j][i] = closeness
+        
+        self.proximity_matrix = matrix
+        self.classroom_max_closeness = [max(row, default=0.0) for row in matrix]
+        
         print(f"✓ {len(self.classroom_proximity_cache)} derslik için yakınlık cache'i hazır")
     
-    def _has_student_conflict(self, existing_exams: List[ExamAssignment], new_exam: ExamAssignment) -> bool:
+    def _build_instructor_availability_index(self):
         """
-        Öğrenci bazlı çakışma kontrolü
-        Aynı öğrencinin aynı saatte iki farklı sınavı olamaz
+        Hoca müsaitlik tablosunu tek sorguda belleğe al
+        (hoca, tarih) başına dakika cinsinden, başlangıca göre sıralı aralıklar tutulur
         """
-        new_course_students = self.student_course_cache.get(new_exam.course_id, set())
-        if not new_course_students:
-            return False
-        
-        for exam in existing_exams:
-            if exam.date != new_exam.date:
-                continue
-                
-            # Zaman çakışması var mı?
-            if not (exam.end_time <= new_exam.start_time or exam.start_time >= new_exam.end_time):
-                existing_course_students = self.student_course_cache.get(exam.course_id, set())
-                
-                # Ortak öğrenci var mı?
-                common_students = new_course_students.intersection(existing_course_students)
-                if common_students:
-                    print(f"DEBUG: Öğrenci çakışması - {len(common_students)} ortak öğrenci")
-                    return True
+        print("Hoca müsaitlik indeksi oluşturuluyor...")
         
-        return False
-    
-    def _is_instructor_available(self, course: Course, exam_date: date, start: time, end: time) -> bool:
-        """Hoca müsaitlik kontrolü - %100 uyum"""
-        availabilities = InstructorAvailability.query.filter_by(
-            instructor_name=course.instructor, 
-            date=exam_date,
-            is_available=True
-        ).all()
+        index: Dict[Tuple[str, date], List[Tuple[int, int]]] = {}
+        for instructor_name, avail_date, start, end in self.snapshot.availabilities:
+            index.setdefault((instructor_name, avail_date), []).append(
+                (start.hour * 60 + start.minute, end.hour * 60 + end.minute)
+            )
         
-        if not availabilities:
-            # Müsaitlik tanımı yoksa varsayılan olarak müsait kabul et
-            return True
+        for intervals in index.values():
+            intervals.sort()
         
-        for avail in availabilities:
-            if avail.start_time <= start and avail.end_time >= end:
+        self.instructor_availability_index = index
+        print(f"✓ {len(index)} hoca-gün için müsaitlik indeksi hazır")
+    
+    @staticmethod
+    def _fits_availability(intervals: List[Tuple[int, int]], start_minute: int, end_minute: int) -> bool:
+        """[start_minute, end_minute] aralığını tamamen kapsayan bir müsaitlik aralığı var mı (dakika cinsinden)"""
+        for avail_start, avail_end in intervals:
+            if avail_start > start_minute:
+                break
+            if avail_end >= end_minute:
                 return True
         
         return False
     
-    def _classroom_has_conflict(self, existing_exams: List[ExamAssignment], classroom_id: int, 
-                              exam_date: date, start: time, end: time) -> bool:
-        """Derslik çakışma kontrolü"""
-        for exam in existing_exams:
-            if exam.classroom_id != classroom_id or exam.date != exam_date:
+    def _build_slot_tables(self, days: int, time_slots: List[time], start_date: date):
+        """Gün / slot sıralarının tarih ve dakika karşılıklarını bir kez hesapla"""
+        self.day_dates = [start_date + timedelta(days=day_offset) for day_offset in range(days)]
+        self.slot_start_minutes = [slot.hour * 60 + slot.minute for slot in time_slots]
+        self.end_times = {}
+    
+    def _end_times_for(self, duration_minutes: int) -> List[time]:
+        """Süreye göre her başlangıç slotunun bitiş saati (süre başına bir kez hesaplanır)"""
+        end_times = self.end_times.get(duration_minutes)
+        if end_times is None:
+            end_times = []
+            for start_minute in self.slot_start_minutes:
+                # Gece yarısını aşan bitişler zaten başlanabilir maskede yer almaz
+                end_minute = (start_minute + duration_minutes) % (24 * 60)
+                end_times.append(time(hour=end_minute // 60, minute=end_minute % 60))
+            self.end_times[duration_minutes] = end_times
+        return end_times
+    
+    def _expand_groups(self, groups: List[ExamGroup], time_slots: List[time]) -> List[ExamAssignment]:
+        """Sınav kayıtlarını derslik başına ExamAssignment satırlarına aç (yalnızca sonuç için)"""
+        assignments = []
+        for group in groups:
+            exam_date = self.day_dates[group.day_offset]
+            start_slot = time_slots[group.start_index]
+            end_slot = self._end_times_for(self.course_durations[group.course_id])[group.start_index]
+            for classroom_id in group.classroom_ids:
+                assignments.append(ExamAssignment(
+                    course_id=group.course_id,
+                    classroom_id=classroom_id,
+                    date=exam_date,
+                    start_time=start_slot,
+                    end_time=end_slot,
+                    exam_group_id=group.exam_group_id
+                ))
+        return assignments
+    
+    def _build_course_start_masks(self, courses: List[Course], days: int, time_slots: List[time], start_date: date):
+        """
+        Her ders ve gün için başlanabilir slotların bit maskesini bir kez hesapla
+        (gün sonunu aşmayan ve hocanın müsait olduğu başlangıçlar).
+        Hesap tamsayı dakikalarla yapılır; gün sonuna sığan başlangıçlar süre başına,
+        hoca penceresine sığanlar (hoca, gün, süre) başına bir kez bulunur.
+        """
+        self._build_slot_tables(days, time_slots, start_date)
+        fitting_masks: Dict[int, int] = {}  # süre -> gün sonunu aşmayan başlangıçlar
+        window_masks: Dict[Tuple[str, int, int], int] = {}  # (hoca, gün, süre) -> hoca penceresine sığan başlangıçlar
+        
+        for course in courses:
+            duration_minutes = course.exam_duration
+            self.course_slot_counts[course.id] = -(-duration_minutes // self.slot_minutes)
+            self.course_durations[course.id] = duration_minutes
+            
+            if duration_minutes not in fitting_masks:
+                mask = 0
+                for start_index, start_minute in enumerate(self.slot_start_minutes):
+                    if start_minute + duration_minutes <= self.day_end_minute:
+                        mask |= 1 << start_index
+                fitting_masks[duration_minutes] = mask
+            fitting_mask = fitting_masks[duration_minutes]
+            
+            day_masks = []
+            for day_offset, exam_date in enumerate(self.day_dates):
+                intervals = self.instructor_availability_index.get((course.instructor, exam_date))
+                if not intervals:
+                    # Müsaitlik tanımı yoksa gün sonuna sığan tüm başlangıçlar uygundur
+                    day_masks.append(fitting_mask)
+                    continue
+                
+                key = (course.instructor, day_offset, duration_minutes)
+                mask = window_masks.get(key)
+                if mask is None:
+                    mask = 0
+                    for start_index, start_minute in enumerate(self.slot_start_minutes):
+                        if (fitting_mask >> start_index) & 1 and \
+                                self._fits_availability(intervals, start_minute, start_minute + duration_minutes):
+                            mask |= 1 << start_index
+                    window_masks[key] = mask
+                day_masks.append(mask)
+            
+            self.course_start_masks[course.id] = day_masks
+    
+    def _assignment_interval(self, assignment: ExamAssignment, days: int, time_slots: List[time],
+                             start_date: date) -> Optional[Tuple[int, int, int]]:
+        """
+        Atamanın ızgaradaki (gün, başlangıç slotu, slot sayısı) karşılığı; ufuk dışındaysa None
+        Izgaraya oturmayan saatler dıştan yuvarlanır (başlangıç aşağı, bitiş yukarı)
+        """
+        day_offset = (assignment.date - start_date).days
+        if not 0 <= day_offset < days:
+            return None
+        first_minute = time_slots[0].hour * 60 + time_slots[0].minute
+        start_minute = assignment.start_time.hour * 60 + assignment.start_time.minute - first_minute
+        end_minute = assignment.end_time.hour * 60 + assignment.end_time.minute - first_minute
+        start_index = max(start_minute // self.slot_minutes, 0)
+        end_index = min(-(-end_minute // self.slot_minutes), len(time_slots))
+        if end_index <= start_index:
+            return None
+        return day_offset, start_index, end_index - start_index
+    
+    def _reserve_fixed_assignments(self, fixed_assignments: List[ExamAssignment], target_courses: List[Course],
+                                   days: int, time_slots: List[time], start_date: date):
+        """
+        Önceden yerleşmiş (sabit) sınavları doluluk ızgarasına işle ve öğrencisi çakışan
+        derslerin başlangıç maskelerinden örtüşen başlangıçları çıkar.
+        Arama bunları hoca müsaitliği gibi tekli kısıt olarak görür (geri alınmazlar).
+        """
+        intervals_by_course: Dict[int, Set[Tuple[int, int, int]]] = {}
+        
+        for assignment in fixed_assignments:
+            interval = self._assignment_interval(assignment, days, time_slots, start_date)
+            if interval is None:
                 continue
-            if not (exam.end_time <= start or exam.start_time >= end):
-                return True
-        return False
+            day_offset, start_index, slot_count = interval
+            
+            ordinal = self.classroom_index.get(assignment.classroom_id)
+            if ordinal is not None:
+                self._mark_classrooms(day_offset, start_index, slot_count, 1 << ordinal)
+                self.fixed_intervals.append((day_offset, start_index, slot_count, 1 << ordinal))
+            intervals_by_course.setdefault(assignment.course_id, set()).add((day_offset, start_index, slot_count))
+        
+        target_ids = {c.id for c in target_courses}
+        for course_id, intervals in intervals_by_course.items():
+            for neighbor_id in self.course_conflict_graph.get(course_id, {}):
+                if neighbor_id not in target_ids:
+                    continue
+                day_masks = self.course_start_masks[neighbor_id]
+                for day_offset, start_index, slot_count in intervals:
+                    day_masks[day_offset] &= ~self._overlapping_start_mask(
+                        start_index, slot_count, self.course_slot_counts[neighbor_id]
+                    )
+    
+    @staticmethod
+    def _overlapping_start_mask(start_index: int, slot_count: int, other_slot_count: int) -> int:
+        """
+        [start_index, start_index + slot_count) aralığıyla örtüşen, other_slot_count
+        uzunluğundaki sınavların başlangıç slotları: [start - other + 1, start + slot_count - 1]
+        """
+        low = max(start_index - other_slot_count + 1, 0)
+        high = start_index + slot_count - 1
+        return ((1 << (high - low + 1)) - 1) << low
+    
+    @staticmethod
+    def _domain_size(day_masks: List[int]) -> int:
+        """Bir dersin kalan uygun (gün, başlangıç) sayısı"""
+        return sum(bin(mask).count("1") for mask in day_masks)
+    
+    def _select_next_course(self, unscheduled: List[Course], ordering: str, degrees: Dict[int, int],
+                            domains: Dict[int, List[int]],
+                            neighbor_colors: Dict[int, Dict[Tuple[int, int], int]]) -> int:
+        """
+        Sıradaki planlanacak dersin unscheduled listesindeki indeksini döndür
+        Eşitlikte listedeki sıra (öğrenci sayısı azalan) korunur
+        """
+        if ordering == "student_count":
+            return 0
+        
+        if ordering == "degree":
+            def key(course):
+                return (degrees[course.id], course.student_count)
+        elif ordering == "dsatur":
+            def key(course):
+                return (len(neighbor_colors[course.id]), degrees[course.id], course.student_count)
+        else:
+            def key(course):
+                return (-self._domain_size(domains[course.id]), degrees[course.id], course.student_count)
+        
+        return max(range(len(unscheduled)), key=lambda i: key(unscheduled[i]))
+    
+    def _build_occupancy_grid(self, days: int, slot_count: int):
+        """
+        Gün x slot x derslik doluluk ızgarasını hazırla
+        Her (gün, slot) hücresi, o 30 dakikada dolu olan dersliklerin bit maskesidir
+        """
+        self.room_occupancy = [[0] * slot_count for _ in range(days)]
+    
+    def _occupied_classroom_mask(self, day_offset: int, start_index: int, slot_count: int) -> int:
+        """Verilen aralıkta dolu olan derslikler (slot maskelerinin tek bir OR'u)"""
+        occupied = 0
+        for slot_mask in self.room_occupancy[day_offset][start_index:start_index + slot_count]:
+            occupied |= slot_mask
+        return occupied
+    
+    def _mark_classrooms(self, day_offset: int, start_index: int, slot_count: int, classroom_mask: int):
+        """Atama yapılırken derslikleri ızgarada dolu işaretle"""
+        day_slots = self.room_occupancy[day_offset]
+        for slot in range(start_index, start_index + slot_count):
+            day_slots[slot] |= classroom_mask
+    
+    def _release_classrooms(self, day_offset: int, start_index: int, slot_count: int, classroom_mask: int):
+        """Geri alma (backtrack) sırasında derslikleri ızgarada boşalt"""
+        day_slots = self.room_occupancy[day_offset]
+        for slot in range(start_index, start_index + slot_count):
+            day_slots[slot] &= ~classroom_mask
     
     def _get_nearby_classrooms(self, main_classroom_id: int, required_capacity: int, 
                               available_classrooms: List[Classroom]) -> List[Classroom]:
@@ -154,10 +563,127 @@ class AdvancedScheduler:
         
         return nearby_classrooms
     
-    def _find_optimal_classroom_combination(self, course: Course, available_classrooms: List[Classroom]) -> List[Classroom]:
+    def _best_pair_combination(self, classrooms: List[Classroom], required_capacity: int) -> List[Classroom]:
+        """
+        En iyi 2'li derslik kombinasyonu (skor = israf - yakınlık bonusu, düşük skor daha iyi)
+        Derslikler kapasiteye göre sıralanır; yeterli ortak ikili aramayla bulunur ve
+        israf - dersliğin alabileceği maksimum bonus mevcut en iyi skoru aştığında arama kesilir.
+        Eşit skorda listedeki ilk çift seçilir.
+        """
+        order = sorted(range(len(classrooms)), key=lambda pos: classrooms[pos].capacity)
+        capacities = [classrooms[pos].capacity for pos in order]
+        ordinals = [self.classroom_index[classrooms[pos].id] for pos in order]
+        closeness = [self.classroom_max_closeness[ordinal] for ordinal in ordinals]
+        matrix = self.proximity_matrix
+        
+        best_score = float('inf')
+        best_positions: Optional[Tuple[int, int]] = None
+        
+        for a in range(len(order) - 1):
+            first_capacity = capacities[a]
+            bonus_bound = closeness[a] * 20
+            closeness_row = matrix[ordinals[a]]
+            for b in range(bisect_left(capacities, required_capacity - first_capacity, a + 1), len(order)):
+                waste = first_capacity + capacities[b] - required_capacity
+                if waste - bonus_bound > best_score + 1e-9:
+                    break
+                
+                # Yakınlık bonusu (0-20 puan arası)
+                proximity_bonus = closeness_row[ordinals[b]] * 20
+                score = waste - proximity_bonus
+                
+                pos1, pos2 = order[a], order[b]
+                if pos1 > pos2:
+                    pos1, pos2 = pos2, pos1
+                if score < best_score or (score == best_score and (pos1, pos2) < best_positions):
+                    best_score = score
+                    best_positions = (pos1, pos2)
+        
+        if best_positions is None:
+            return []
+        return [classrooms[pos] for pos in best_positions]
+    
+    def _best_triple_combination(self, classrooms: List[Classroom], required_capacity: int) -> List[Classroom]:
+        """
+        En iyi 3'lü derslik kombinasyonu - kapasite sıralı dal-sınır araması
+        Her ikili yakınlık 0-10 puan bonus getirir; alt sınırı (israf - ulaşılabilir
+        maksimum bonus) mevcut en iyi skoru aşan dallar budanır.
+        """
+        order = sorted(range(len(classrooms)), key=lambda pos: classrooms[pos].capacity)
+        capacities = [classrooms[pos].capacity for pos in order]
+        position_ordinals = [self.classroom_index[cl.id] for cl in classrooms]
+        ordinals = [position_ordinals[pos] for pos in order]
+        closeness = [self.classroom_max_closeness[ordinal] for ordinal in ordinals]
+        matrix = self.proximity_matrix
+        global_bound = max(closeness, default=0.0) * 10
+        count = len(order)
+        
+        best_score = float('inf')
+        best_positions: Optional[Tuple[int, int, int]] = None
+        
+        for a in range(count - 2):
+            # a'dan başlayan en küçük üçlü bile yeterince iyi değilse, sonrakiler de olamaz
+            if max(capacities[a] + capacities[a + 1] + capacities[a + 2] - required_capacity, 0) - 3 * global_bound > best_score + 1e-9:
+                break
+            # a ile kurulan iki ikili + kalan ikili için üst sınır
+            a_bound = closeness[a] * 20 + global_bound
+            row_a = matrix[ordinals[a]]
+            for b in range(a + 1, count - 1):
+                partial_capacity = capacities[a] + capacities[b]
+                if max(partial_capacity + capacities[b + 1] - required_capacity, 0) - a_bound > best_score + 1e-9:
+                    break
+                bonus_bound = (row_a[ordinals[b]] + closeness[a] + closeness[b]) * 10
+                for c in range(bisect_left(capacities, required_capacity - partial_capacity, b + 1), count):
+                    waste = partial_capacity + capacities[c] - required_capacity
+                    if waste - bonus_bound > best_score + 1e-9:
+                        break
+                    
+                    pos1, pos2, pos3 = sorted((order[a], order[b], order[c]))
+                    ordinal1, ordinal2, ordinal3 = position_ordinals[pos1], position_ordinals[pos2], position_ordinals[pos3]
+                    
+                    # 3'lü için yakınlık bonusu: cl1-cl2, cl1-cl3, cl2-cl3 (her ikili 0-10 puan)
+                    # Terimler tek tek ölçeklenip bu sırayla toplanır: kayan nokta toplamı tam taramayla
+                    # birebir aynı olur, eşit skorlarda aynı (listede ilk) üçlü seçilir
+                    proximity_bonus = (matrix[ordinal1][ordinal2] * 10 + matrix[ordinal1][ordinal3] * 10
+                                       + matrix[ordinal2][ordinal3] * 10)
+                    score = waste - proximity_bonus
+                    if score < best_score or (score == best_score and (pos1, pos2, pos3) < best_positions):
+                        best_score = score
+                        best_positions = (pos1, pos2, pos3)
+        
+        if best_positions is None:
+            return []
+        return [classrooms[pos] for pos in best_positions]
+    
+    def _cached_classroom_combination(self, course: Course, available_classrooms: List[Classroom],
+                                      free_mask: int, verbose: bool = True) -> List[Classroom]:
+        """
+        _find_optimal_classroom_combination'ın önbellekli hali
+        Sonuç yalnızca gerekli kapasiteye, özel mekan gereksinimine ve boş derslik kümesine
+        bağlıdır; aynı anahtar (boş bir günün her slotu, aynı öğrenci sayılı dersler) tekrar
+        geldiğinde kombinasyon araması hiç yapılmaz.
+        free_mask: available_classrooms'un derslik sırası bitleri
+        """
+        key = (course.student_count, bool(course.requires_special_room), free_mask)
+        cached = self.combination_cache.get(key)
+        if cached is not None:
+            self.combination_cache.move_to_end(key)
+            self.combination_cache_stats['hits'] += 1
+            return list(cached)
+        
+        self.combination_cache_stats['misses'] += 1
+        selected_classrooms = self._find_optimal_classroom_combination(course, available_classrooms, verbose)
+        self.combination_cache[key] = tuple(selected_classrooms)
+        if len(self.combination_cache) > COMBINATION_CACHE_SIZE:
+            self.combination_cache.popitem(last=False)
+        return selected_classrooms
+    
+    def _find_optimal_classroom_combination(self, course: Course, available_classrooms: List[Classroom],
+                                            verbose: bool = True) -> List[Classroom]:
         """
         Ders için EN OPTIMAL derslik kombinasyonunu bul
         VERİMLİLİK + YAKINLIK dengeli yaklaşım
+        verbose=False: DEBUG çıktısı basılmaz (yerel aramadaki sık çağrılar için)
         """
         required_capacity = course.student_count
         
@@ -175,102 +701,41 @@ class AdvancedScheduler:
             # EN KÜÇÜK uygun dersliği seç (MINIMUM İSRAF)
             best_single = min(suitable_single, key=lambda cl: cl.capacity)
             waste = best_single.capacity - required_capacity
-            print(f"DEBUG: {course.name} -> Tek derslik: {best_single.name} ({best_single.capacity}) - İsraf: {waste}")
+            if verbose:
+                print(f"DEBUG: {course.name} -> Tek derslik: {best_single.name} ({best_single.capacity}) - İsraf: {waste}")
             return [best_single]
         
         # 2. Birden fazla derslik gerekli - VERİMLİLİK + YAKINLIK
-        print(f"DEBUG: {course.name} için çoklu derslik gerekli ({required_capacity} kişi)")
+        if verbose:
+            print(f"DEBUG: {course.name} için çoklu derslik gerekli ({required_capacity} kişi)")
         
-        best_combination = None
-        best_score = float('inf')
-        
-        # Tüm olası 2'li kombinasyonları dene
-        for i, classroom1 in enumerate(available_classrooms):
-            for j, classroom2 in enumerate(available_classrooms[i+1:], i+1):
-                total_capacity = classroom1.capacity + classroom2.capacity
-                
-                if total_capacity >= required_capacity:
-                    waste = total_capacity - required_capacity
-                    
-                    # Yakınlık bonusu hesapla
-                    proximity_bonus = 0
-                    if classroom1.id in self.classroom_proximity_cache:
-                        for nearby_id, distance in self.classroom_proximity_cache[classroom1.id]:
-                            if nearby_id == classroom2.id:
-                                # Yakın derslikler için bonus (0-20 puan arası)
-                                proximity_bonus = (1.0 - distance) * 20
-                                break
-                    
-                    # TOPLAM SKOR = İsraf - Yakınlık Bonusu (düşük skor daha iyi)
-                    score = waste - proximity_bonus
-                    
-                    if score < best_score:
-                        best_score = score
-                        best_combination = [classroom1, classroom2]
-                        print(f"DEBUG: Yeni en iyi: {classroom1.name}({classroom1.capacity}) + {classroom2.name}({classroom2.capacity}) = {total_capacity} (İsraf: {waste}, Yakınlık: {proximity_bonus:.1f}, Skor: {score:.1f})")
+        best_combination = self._best_pair_combination(available_classrooms, required_capacity)
         
         if best_combination:
             classroom_info = ", ".join([f"{cl.name}({cl.capacity})" for cl in best_combination])
             total_capacity = sum(cl.capacity for cl in best_combination)
             waste = total_capacity - required_capacity
-            print(f"DEBUG: {course.name} -> OPTIMAL kombinasyon: {classroom_info} (toplam: {total_capacity}, israf: {waste})")
+            if verbose:
+                print(f"DEBUG: {course.name} -> OPTIMAL kombinasyon: {classroom_info} (toplam: {total_capacity}, israf: {waste})")
             return best_combination
         
         # 3. 2'li kombinasyon bulunamazsa, 3'lü dene
-        print(f"DEBUG: {course.name} için 3'lü kombinasyon deneniyor...")
+        if verbose:
+            print(f"DEBUG: {course.name} için 3'lü kombinasyon deneniyor...")
         
-        best_3_combination = None
-        best_3_score = float('inf')
-        
-        # Tüm olası 3'lü kombinasyonları dene
-        for i, cl1 in enumerate(available_classrooms):
-            for j, cl2 in enumerate(available_classrooms[i+1:], i+1):
-                for k, cl3 in enumerate(available_classrooms[j+1:], j+1):
-                    total_capacity = cl1.capacity + cl2.capacity + cl3.capacity
-                    
-                    if total_capacity >= required_capacity:
-                        waste = total_capacity - required_capacity
-                        
-                        # 3'lü için yakınlık bonusu (daha karmaşık)
-                        proximity_bonus = 0
-                        
-                        # cl1-cl2 yakınlığı
-                        if cl1.id in self.classroom_proximity_cache:
-                            for nearby_id, distance in self.classroom_proximity_cache[cl1.id]:
-                                if nearby_id == cl2.id:
-                                    proximity_bonus += (1.0 - distance) * 10
-                                    break
-                        
-                        # cl1-cl3 yakınlığı
-                        if cl1.id in self.classroom_proximity_cache:
-                            for nearby_id, distance in self.classroom_proximity_cache[cl1.id]:
-                                if nearby_id == cl3.id:
-                                    proximity_bonus += (1.0 - distance) * 10
-                                    break
-                        
-                        # cl2-cl3 yakınlığı
-                        if cl2.id in self.classroom_proximity_cache:
-                            for nearby_id, distance in self.classroom_proximity_cache[cl2.id]:
-                                if nearby_id == cl3.id:
-                                    proximity_bonus += (1.0 - distance) * 10
-                                    break
-                        
-                        score = waste - proximity_bonus
-                        
-                        if score < best_3_score:
-                            best_3_score = score
-                            best_3_combination = [cl1, cl2, cl3]
-                            print(f"DEBUG: Yeni en iyi 3'lü: {cl1.name}({cl1.capacity}) + {cl2.name}({cl2.capacity}) + {cl3.name}({cl3.capacity}) = {total_capacity} (İsraf: {waste}, Yakınlık: {proximity_bonus:.1f}, Skor: {score:.1f})")
+        best_3_combination = self._best_triple_combination(available_classrooms, required_capacity)
         
         if best_3_combination:
             classroom_info = ", ".join([f"{cl.name}({cl.capacity})" for cl in best_3_combination])
             total_capacity = sum(cl.capacity for cl in best_3_combination)
             waste = total_capacity - required_capacity
-            print(f"DEBUG: {course.name} -> OPTIMAL 3'lü: {classroom_info} (toplam: {total_capacity}, israf: {waste})")
+            if verbose:
+                print(f"DEBUG: {course.name} -> OPTIMAL 3'lü: {classroom_info} (toplam: {total_capacity}, israf: {waste})")
             return best_3_combination
         
         # 4. Son çare: 4'lü kombinasyon (yakınlık gözetmeden)
-        print(f"DEBUG: {course.name} için 4'lü kombinasyon deneniyor...")
+        if verbose:
+            print(f"DEBUG: {course.name} için 4'lü kombinasyon deneniyor...")
         
         # Kapasiteye göre sırala (büyükten küçüğe)
         sorted_classrooms = sorted(available_classrooms, key=lambda cl: cl.capacity, reverse=True)
@@ -285,13 +750,15 @@ class AdvancedScheduler:
             remaining_capacity -= classroom.capacity
         
         if remaining_capacity > 0:
-            print(f"DEBUG: {course.name} için kapasite yetersiz: {remaining_capacity} kişi daha gerekli")
+            if verbose:
+                print(f"DEBUG: {course.name} için kapasite yetersiz: {remaining_capacity} kişi daha gerekli")
             return []
         
         classroom_info = ", ".join([f"{cl.name}({cl.capacity})" for cl in selected_classrooms])
         total_capacity = sum(cl.capacity for cl in selected_classrooms)
         waste = total_capacity - required_capacity
-        print(f"DEBUG: {course.name} -> Çoklu derslik: {classroom_info} (toplam: {total_capacity}, israf: {waste})")
+        if verbose:
+            print(f"DEBUG: {course.name} -> Çoklu derslik: {classroom_info} (toplam: {total_capacity}, israf: {waste})")
         
         return selected_classrooms
     
@@ -311,19 +778,53 @@ class AdvancedScheduler:
         return slots
     
     def generate_exam_schedule(self, courses: List[Course], classrooms: List[Classroom], 
-                             days: int = 7, start_date: Optional[date] = None) -> ScheduleResult:
+                             days: int = 7, start_date: Optional[date] = None,
+                             ordering: str = "student_count", time_limit: Optional[float] = None,
+                             node_limit: Optional[int] = None, improve_time: Optional[float] = None,
+                             seed: Optional[int] = None, should_stop: Optional[Callable[[], bool]] = None,
+                             fixed_assignments: Optional[List[ExamAssignment]] = None,
+                             warm_start: Optional[List[ExamAssignment]] = None,
+                             on_progress: Optional[Callable[[Callable[[], Dict]], None]] = None) -> ScheduleResult:
         """
         Gelişmiş sınav programı oluştur
+        ordering: sıradaki dersi seçme stratejisi (bkz. ORDERING_STRATEGIES)
+        time_limit / node_limit: arama bütçesi (saniye / yerleştirme sayısı); bütçe bitince
+        o ana kadar bulunan en iyi kısmi atama döner, yerleşmeyen dersler
+        statistics['unscheduled_courses'] içindedir
+        improve_time: verilirse bulunan program bu kadar saniye yerel arama ile iyileştirilir
+        (bkz. local_search.py)
+        seed: verilirse eşit öncelikli derslerin sırası bu tohumla karıştırılır (portföy çeşitliliği)
+        should_stop: arama sırasında ara ara çağrılır, True dönerse arama iptal edilir
+        fixed_assignments: yeri değişmeyecek, önceden yerleşmiş sınavlar; derslikleri ve öğrenci
+        çakışmaları dikkate alınır, dersleri yeniden planlanmaz ve sonuçta yer almaz
+        warm_start: derslerin önceki atamaları; her ders önce eski gün/saat ve dersliklerinde denenir
+        on_progress: arama başlarken bir kez, anlık durumu döndüren çağrıyla (ScheduleSearch.progress)
+        çağrılır; dinleyici ilerlemeyi yalnızca ihtiyaç duyduğunda bu çağrıyla okur
         """
+        if ordering not in ORDERING_STRATEGIES:
+            raise ValueError(f"Geçersiz sıralama stratejisi: {ordering}")
+        
         if start_date is None:
             start_date = date.today()
         
+        # Motor yalnızca ORM'den bağımsız kopya üzerinde çalışır; verilen nesneler kopyadakilerle değiştirilir
+        if self.snapshot is None:
+            self.snapshot = build_snapshot(courses, classrooms)
+        course_copies = {c.id: c for c in self.snapshot.courses}
+        classroom_copies = {cl.id: cl for cl in self.snapshot.classrooms}
+        courses = [course_copies[c.id] for c in courses if c.id in course_copies]
+        classrooms = [classroom_copies[cl.id] for cl in classrooms if cl.id in classroom_copies]
+        
         # Cache'leri oluştur
         self._build_student_course_cache()
+        self._build_conflict_graph()
+        self._build_classroom_index(classrooms)
         self._build_proximity_cache()
+        self._build_instructor_availability_index()
         
-        # Sadece sınavı olan dersler
-        target_courses = [c for c in courses if c.has_exam]
+        # Sadece sınavı olan (ve sabit bir sınavı olmayan) dersler
+        fixed_course_ids = {a.course_id for a in fixed_assignments or []}
+        target_courses = [c for c in courses if c.has_exam and c.id not in fixed_course_ids]
         if not target_courses:
             return ScheduleResult(
                 success=False, 
@@ -333,116 +834,109 @@ class AdvancedScheduler:
             )
         
         # Dersleri öğrenci sayısına göre azalan sırada sırala (büyük dersler önce)
+        if seed:
+            random.Random(seed).shuffle(target_courses)
         target_courses.sort(key=lambda c: c.student_count, reverse=True)
         
         print(f"SCHEDULER: {len(target_courses)} ders planlanacak")
         print(f"SCHEDULER: {len(classrooms)} derslik mevcut")
+        print(f"SCHEDULER: Sıralama stratejisi -> {ordering}")
         
-        assignments: List[ExamAssignment] = []
-        time_slots = self.generate_time_slots()
+        time_slots = self.generate_time_slots(slot_minutes=self.slot_minutes)
+        self._build_occupancy_grid(days, len(time_slots))
+        self._build_course_start_masks(target_courses, days, time_slots, start_date)
+        self.fixed_intervals = []
+        if fixed_assignments:
+            self._reserve_fixed_assignments(fixed_assignments, target_courses, days, time_slots, start_date)
         
-        statistics = {
-            'total_courses': len(target_courses),
-            'scheduled_courses': 0,
-            'failed_courses': [],
-            'total_classrooms_used': 0,
-            'average_classroom_utilization': 0
-        }
+        # Önceki program: ders -> (gün, başlangıç slotu, derslik id'leri)
+        preferred_placements: Dict[int, Tuple[int, int, List[int]]] = {}
+        for assignment in warm_start or []:
+            preferred = preferred_placements.get(assignment.course_id)
+            if preferred is not None:
+                preferred[2].append(assignment.classroom_id)
+                continue
+            interval = self._assignment_interval(assignment, days, time_slots, start_date)
+            if interval is not None:
+                preferred_placements[assignment.course_id] = (interval[0], interval[1], [assignment.classroom_id])
         
-        def backtrack(course_index: int) -> bool:
-            if course_index >= len(target_courses):
-                return True
-            
-            course = target_courses[course_index]
-            duration_minutes = course.exam_duration
-            
-            print(f"SCHEDULER: Planlama -> {course.name} ({course.student_count} öğrenci, {duration_minutes} dk)")
-            
-            for day_offset in range(days):
-                exam_date = start_date + timedelta(days=day_offset)
-                
-                for start_slot in time_slots:
-                    # Bitiş saatini hesapla
-                    start_dt = timedelta(hours=start_slot.hour, minutes=start_slot.minute)
-                    end_dt = start_dt + timedelta(minutes=duration_minutes)
-                    
-                    # Gün sınırını aşmasın
-                    if end_dt.total_seconds() > timedelta(hours=18).total_seconds():
-                        continue
-                    
-                    end_slot = time(
-                        hour=int(end_dt.total_seconds() // 3600),
-                        minute=int((end_dt.total_seconds() % 3600) // 60)
-                    )
-                    
-                    # Hoca müsait mi?
-                    if not self._is_instructor_available(course, exam_date, start_slot, end_slot):
-                        continue
-                    
-                    # Mevcut derslikleri filtrele
-                    available_classrooms = [
-                        cl for cl in classrooms
-                        if not self._classroom_has_conflict(assignments, cl.id, exam_date, start_slot, end_slot)
-                    ]
-                    
-                    if not available_classrooms:
-                        continue
-                    
-                    # Optimal derslik kombinasyonunu bul
-                    selected_classrooms = self._find_optimal_classroom_combination(course, available_classrooms)
-                    
-                    if not selected_classrooms:
-                        continue
-                    
-                    # Geçici atamalar oluştur
-                    exam_group_id = str(uuid.uuid4())[:8]
-                    temp_assignments = []
-                    
-                    for classroom in selected_classrooms:
-                        temp_assignment = ExamAssignment(
-                            course_id=course.id,
-                            classroom_id=classroom.id,
-                            date=exam_date,
-                            start_time=start_slot,
-                            end_time=end_slot,
-                            exam_group_id=exam_group_id
-                        )
-                        temp_assignments.append(temp_assignment)
-                    
-                    # Öğrenci çakışması kontrolü (sadece bir kez, ilk derslik için)
-                    if self._has_student_conflict(assignments, temp_assignments[0]):
-                        continue
-                    
-                    # Uygun slot bulundu - atamaları ekle
-                    assignments.extend(temp_assignments)
-                    
-                    # Sıradaki dersi dene
-                    if backtrack(course_index + 1):
-                        statistics['scheduled_courses'] += 1
-                        return True
-                    
-                    # Geri al (backtrack)
-                    for _ in temp_assignments:
-                        assignments.pop()
-            
-            # Bu ders için uygun slot bulunamadı
-            statistics['failed_courses'].append(course.name)
-            print(f"SCHEDULER: BAŞARISIZ -> {course.name}")
-            return False
+        # Ucuz alt sınırlarla çözülemezlik kontrolü: çözüm yoksa arama motoru hiç kurulmaz
+        from feasibility import COURSE_CHECKS, check_feasibility
+        issues = check_feasibility(self, target_courses, classrooms, days, len(time_slots))
+        
+        # Bütçeli aramada tek derse ait bulgular (kapasite, uygun başlangıç) yalnızca o dersleri dışarıda
+        # bırakır; genel sınırlar (koltuk arzı, klik) kalan dersler için yeniden hesaplanır
+        search_courses = target_courses
+        excluded_ids: Set[int] = set()
+        if time_limit is not None or node_limit is not None:
+            course_issues = [issue for issue in issues if issue.fatal and issue.check in COURSE_CHECKS]
+            excluded_ids = {course_id for issue in course_issues for course_id in issue.course_ids}
+            if excluded_ids:
+                search_courses = [c for c in target_courses if c.id not in excluded_ids]
+                for issue in course_issues:
+                    issue.fatal = False
+                    issue.message += " (bu dersler programa alınmadı)"
+                issues = [issue for issue in issues if issue.check in COURSE_CHECKS] + [
+                    issue for issue in check_feasibility(self, search_courses, classrooms, days, len(time_slots))
+                    if issue.check not in COURSE_CHECKS
+                ]
+        feasibility = [{'check': issue.check, 'message': issue.message, 'fatal': issue.fatal} for issue in issues]
+        fatal_issues = [issue for issue in issues if issue.fatal]
+        for issue in issues:
+            print(f"SCHEDULER: Fizibilite {'HATASI' if issue.fatal else 'uyarısı'} -> {issue.message}")
+        if fatal_issues:
+            statistics = search_statistics(target_courses, ordering)
+            statistics['unscheduled_courses'] = [c.name for c in target_courses]
+            statistics['feasibility'] = feasibility
+            return ScheduleResult(
+                success=False,
+                message="Program bu girdilerle oluşturulamaz: " + " ".join(issue.message for issue in fatal_issues),
+                exams=[],
+                statistics=statistics
+            )
+        
+        # Açık yığınlı arama motoru (özyineleme yok)
+        search = ScheduleSearch(self, search_courses, classrooms, days, start_date, time_slots, ordering,
+                                time_limit=time_limit, node_limit=node_limit, should_stop=should_stop,
+                                preferred_placements=preferred_placements, on_progress=on_progress)
+        
+        status = search.run()
+        success = status == ScheduleSearch.SUCCESS and not excluded_ids
+        
+        # Başarısızlıkta veya bütçe bittiğinde en çok dersi yerleştiren kısmi atama döner
+        groups = search.best_groups
+        statistics = search.statistics
+        
+        # İsteğe bağlı iyileştirme: derslik israfı ve yakınlık için yerel arama
+        if improve_time and groups:
+            from local_search import ScheduleImprover
+            improver = ScheduleImprover(self, search_courses, classrooms, days, start_date, time_slots, seed=seed)
+            groups = improver.improve(groups, improve_time, should_stop=should_stop)
+            statistics['local_search'] = improver.statistics
         
-        # Planlama başlat
-        success = backtrack(0)
+        # Derslik başına satırlar yalnızca burada üretilir
+        assignments = self._expand_groups(groups, time_slots)
+        statistics['classroom_combination_cache'] = dict(self.combination_cache_stats,
+                                                         size=len(self.combination_cache))
+        statistics['feasibility'] = feasibility
         
         # İstatistikleri tamamla
         used_classrooms = set(exam.classroom_id for exam in assignments)
+        statistics['total_courses'] = len(target_courses)
         statistics['total_classrooms_used'] = len(used_classrooms)
+        statistics['scheduled_courses'] = len(search.best_course_ids)
+        statistics['unscheduled_courses'] = [
+            c.name for c in target_courses if c.id not in search.best_course_ids
+        ]
         
         if success:
             message = f"Tüm dersler başarıyla planlandı! {len(assignments)} sınav ataması yapıldı."
         else:
             scheduled_count = statistics['scheduled_courses']
-            failed_count = len(statistics['failed_courses'])
+            failed_count = len(statistics['unscheduled_courses'])
             message = f"Kısmi başarı: {scheduled_count}/{len(target_courses)} ders planlandı. {failed_count} ders planlanamadı."
+            if status == ScheduleSearch.STOPPED:
+                message = STOP_REASONS[statistics['stopped_by']] + " " + message
         
         return ScheduleResult(
             success=success,
@@ -452,9 +946,475 @@ class AdvancedScheduler:
         )
 
 
+def search_statistics(target_courses: List[Course], ordering: str) -> Dict:
+    """Aramanın başlangıç istatistikleri (arama hiç başlamasa da sonuç aynı anahtarları taşır)"""
+    return {
+        'total_courses': len(target_courses),
+        'scheduled_courses': 0,
+        'failed_courses': {},  # ders adı -> başarısızlık sayısı
+        'total_classrooms_used': 0,
+        'average_classroom_utilization': 0,
+        'ordering': ordering,
+        'stopped_by': None,
+        'elapsed_seconds': 0,
+        'nodes': 0,
+        'backtracks': 0,
+        'domain_wipeouts': 0,
+        'backjumps': 0,
+        'failure_causes': {'student_conflict': 0, 'classroom_capacity': 0, 'instructor_window': 0}
+    }
+
+
+@dataclass
+class SearchFrame:
+    """Açık yığındaki bir seçim noktası: bir ders ve o ders için denenmemiş (gün, başlangıç) değerleri"""
+    course: Course
+    course_position: int  # unscheduled listesindeki eski yeri (geri koymak için)
+    depth: int
+    day_masks: List[int]  # çerçeve açıldığındaki domain kopyası
+    conflict_set: Set[int]  # başarısızlıktan sorumlu planlanmış dersler
+    day_offset: int = 0
+    remaining_mask: int = 0  # mevcut günün denenmemiş başlangıçları
+    placement: Optional[Tuple[int, int, int, int]] = None  # (gün, başlangıç, slot sayısı, derslik maskesi)
+    trail_length: int = 0
+    pruned_by_length: int = 0
+    preferred_start: Optional[Tuple[int, int]] = None  # önceki programdaki (gün, başlangıç), ilk denenir
+    try_preferred: bool = False
+
+
+class ScheduleSearch:
+    """
+    Açık yığınlı arama motoru (ileri kontrol + çatışma yönlendirmeli geri atlama)
+    Her seçim noktası stack'te bir SearchFrame'dir; step() tek bir değer dener,
+    run() arama bitene ya da bütçe (time_limit / node_limit) dolana kadar step() çağırır.
+    Python özyineleme sınırı yoktur ve arama adımlar arasında durdurulup
+    stack / placements / statistics incelenebilir.
+    """
+    
+    RUNNING = "running"
+    SUCCESS = "success"
+    FAILED = "failed"
+    STOPPED = "stopped"  # bütçe doldu, en iyi kısmi atama best_groups içinde
+    
+    def __init__(self, scheduler: AdvancedScheduler, target_courses: List[Course], classrooms: List[Classroom],
+                 days: int, start_date: date, time_slots: List[time], ordering: str,
+                 time_limit: Optional[float] = None, node_limit: Optional[int] = None,
+                 should_stop: Optional[Callable[[], bool]] = None,
+                 preferred_placements: Optional[Dict[int, Tuple[int, int, List[int]]]] = None,
+                 on_progress: Optional[Callable[[Callable[[], Dict]], None]] = None):
+        self.scheduler = scheduler
+        self.target_courses = target_courses
+        self.classrooms = classrooms
+        self.days = days
+        self.start_date = start_date
+        self.time_slots = time_slots
+        self.ordering = ordering
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.should_stop = should_stop
+        self.on_progress = on_progress
+        self.preferred_placements = preferred_placements or {}
+        self.classrooms_by_id: Dict[int, Classroom] = {cl.id: cl for cl in classrooms}
+        
+        conflict_graph = scheduler.course_conflict_graph
+        target_ids = {c.id for c in target_courses}
+        
+        # Dinamik sıralama durumu
+        self.degrees: Dict[int, int] = {
+            c.id: sum(1 for neighbor_id in conflict_graph.get(c.id, {}) if neighbor_id in target_ids)
+            for c in target_courses
+        }
+        self.placements: Dict[int, Tuple[int, int, int]] = {}  # course_id -> (gün, başlangıç slotu, slot sayısı)
+        self.neighbor_colors: Dict[int, Dict[Tuple[int, int], int]] = {c.id: {} for c in target_courses}
+        self.unscheduled: List[Course] = list(target_courses)
+        self.groups: List[ExamGroup] = []  # yerleşim sırasıyla (geri alma yığının tepesinden)
+        
+        # İleri kontrol (forward checking): her dersin kalan uygun başlangıçları, gün başına bit maskesi
+        self.domains: Dict[int, List[int]] = {c.id: list(scheduler.course_start_masks[c.id]) for c in target_courses}
+        self.domain_trail: List[Tuple[int, int, int]] = []  # (course_id, gün, eski maske) - geri alma için
+        
+        # Çatışma yönlendirmeli geri atlama (backjumping): her dersin domain'ini budayan planlanmış dersler
+        self.pruned_by: Dict[int, Set[int]] = {c.id: set() for c in target_courses}
+        self.pruned_by_trail: List[Tuple[int, int]] = []  # (budanan course_id, budayan course_id)
+        self.depth_of: Dict[int, int] = {}  # planlanmış course_id -> arama derinliği
+        
+        # Anytime mod: şimdiye kadar en çok dersi yerleştiren kısmi atama
+        self.best_groups: List[ExamGroup] = []
+        self.best_course_ids: Set[int] = set()
+        # Anytime modda, hiçbir planlanmış dersin sorumlu olmadığı başarısızlıkta bırakılan dersler
+        self.dropped_courses: List[Course] = []
+        self.dropped_ids: Set[int] = set()
+        self.failure_counts: Dict[int, int] = {}
+        # Bütçe dolduğunda kalan dersler geri dönüşsüz (açgözlü) yerleştirilir
+        self.greedy = False
+        
+        self.statistics = search_statistics(target_courses, ordering)
+        
+        self.stack: List[SearchFrame] = []
+        self.status = self.RUNNING
+        self._open_frame()
+    
+    def run(self) -> str:
+        """Arama bitene ya da bütçe dolana kadar adım at; SUCCESS, FAILED veya STOPPED döner"""
+        started = perf_counter()
+        deadline = started + self.time_limit if self.time_limit is not None else None
+        steps = 0
+        if self.on_progress is not None:
+            # Dinleyici anlık durumu istediğinde okur; kontrol noktalarında sözlük kurulmaz
+            self.on_progress(partial(self.progress, started))
+        while self.status == self.RUNNING:
+            if not self.greedy and deadline is not None and perf_counter() >= deadline:
+                self._start_greedy('time_limit')
+            elif not self.greedy and self.node_limit is not None and self.statistics['nodes'] >= self.node_limit:
+                self._start_greedy('node_limit')
+            elif steps % 256 == 0 and self._checkpoint():
+                # Dış iptal isteği (ör. portföyde başka bir süreç çözümü buldu); seyrek kontrol edilir
+                self.stop('cancelled')
+            else:
+                self.step()
+                steps += 1
+        self.statistics['elapsed_seconds'] = round(perf_counter() - started, 3)
+        return self.status
+
+    def _checkpoint(self) -> bool:
+        """Seyrek kontrol noktası: dış iptal isteği varsa True dön"""
+        return self.should_stop is not None and self.should_stop()
+    
+    def progress(self, started: float) -> Dict:
+        """Aramanın anlık durumu: yakınsıyor mu yoksa aynı yerde mi dönüyor"""
+        statistics = self.statistics
+        elapsed = perf_counter() - started
+        nodes = statistics['nodes']
+        cache_stats = self.scheduler.combination_cache_stats
+        lookups = cache_stats['hits'] + cache_stats['misses']
+        return {
+            'course_index': len(self.stack),  # arama sırasında denenen dersin derinliği
+            'scheduled_courses': len(self.placements),
+            'best_partial': max(len(self.placements), len(self.best_course_ids)),
+            'total_courses': len(self.target_courses),
+            'nodes': nodes,
+            'backtracks': statistics['backtracks'],
+            'backjumps': statistics['backjumps'],
+            'domain_wipeouts': statistics['domain_wipeouts'],
+            'nodes_per_second': round(nodes / elapsed, 1) if elapsed > 0 else 0.0,
+            'combination_cache_hit_rate': round(cache_stats['hits'] / lookups, 3) if lookups else 0.0,
+            'wipeout_rate': round(statistics['domain_wipeouts'] / nodes, 3) if nodes else 0.0,
+            'elapsed_seconds': round(elapsed, 3),
+        }
+
+    def stop(self, reason: str):
+        """Aramayı durdur; mevcut durum en iyi kısmi atamadan iyiyse onu sakla"""
+        if self.status != self.RUNNING:
+            return
+        self._remember_best()
+        self.statistics['stopped_by'] = reason
+        self.status = self.STOPPED
+        print(f"SCHEDULER: Arama durduruldu ({reason}), {len(self.best_course_ids)} ders yerleşik")
+    
+    def _start_greedy(self, reason: str):
+        """
+        Bütçe doldu: geri dönüş yapılmaz, başarısız olan ders bırakılır ve kalan dersler
+        mevcut yerleşimin üzerine sırayla yerleştirilir (her ders için domain'i bir kez taranır)
+        """
+        self.greedy = True
+        self.statistics['stopped_by'] = reason
+        print(f"SCHEDULER: Bütçe doldu ({reason}), kalan {len(self.unscheduled) + 1} ders geri dönüşsüz yerleştirilecek")
+
+    def _remember_best(self):
+        """Mevcut kısmi atama şimdiye kadarki en iyisiyse kopyasını sakla"""
+        if len(self.placements) > len(self.best_course_ids):
+            self.best_groups = list(self.groups)
+            self.best_course_ids = set(self.placements)
+    
+    def step(self) -> str:
+        """Tepedeki çerçeve için sıradaki (gün, başlangıç) değerini dene"""
+        if self.status != self.RUNNING:
+            return self.status
+        
+        frame = self.stack[-1]
+        candidate = self._next_candidate(frame)
+        if candidate is None:
+            self._fail_frame()
+            return self.status
+        
+        day_offset, start_index = candidate
+        course = frame.course
+        scheduler = self.scheduler
+        slot_count = scheduler.course_slot_counts[course.id]
+        
+        # Mevcut derslikleri filtrele (ızgaradan tek OR ile dolu maske)
+        occupied_mask = scheduler._occupied_classroom_mask(day_offset, start_index, slot_count)
+        available_classrooms = [
+            cl for i, cl in enumerate(self.classrooms)
+            if not (occupied_mask >> i) & 1
+        ]
+        
+        # Önceki programdaki yerinde, eski derslikleri hâlâ boş ve yeterliyse onları koru
+        selected_classrooms = []
+        if frame.preferred_start == candidate:
+            selected_classrooms = self._preferred_classrooms(course, occupied_mask)
+        
+        # Optimal derslik kombinasyonunu bul
+        if not selected_classrooms and available_classrooms:
+            selected_classrooms = scheduler._cached_classroom_combination(
+                course, available_classrooms, scheduler.all_classrooms_mask & ~occupied_mask
+            )
+        
+        if not selected_classrooms:
+            # Derslik yetersiz - aralıkta derslik tutan dersler sorumlu
+            self.statistics['failure_causes']['classroom_capacity'] += 1
+            frame.conflict_set |= self._classroom_culprits(day_offset, start_index, slot_count)
+            return self.status
+        
+        self._place(frame, day_offset, start_index, slot_count, selected_classrooms)
+        
+        wiped_course_id = self._prune_neighbor_domains(course, day_offset, start_index, slot_count)
+        if wiped_course_id is not None:
+            # Bir komşunun hiç seçeneği kalmadı - alt ağaca inmeden geri dön;
+            # o komşuyu budayan dersler bu başarısızlığın sorumlusudur
+            self.statistics['domain_wipeouts'] += 1
+            self.statistics['failure_causes']['student_conflict'] += 1
+            conflicts = set(self.pruned_by[wiped_course_id])
+            self._undo_placement(frame)
+            self._receive_conflicts(conflicts)
+            return self.status
+        
+        # Sıradaki dersi aç
+        self._open_frame()
+        return self.status
+    
+    def _open_frame(self):
+        """Sıradaki dersi seçip yığına yeni bir seçim noktası ekle"""
+        if not self.unscheduled:
+            self._remember_best()
+            if not self.dropped_courses:
+                self.status = self.SUCCESS
+            else:
+                self.status = self.STOPPED if self.greedy else self.FAILED
+            return
+        
+        course_position = self.scheduler._select_next_course(
+            self.unscheduled, self.ordering, self.degrees, self.domains, self.neighbor_colors
+        )
+        course = self.unscheduled.pop(course_position)
+        
+        if not any(self.scheduler.course_start_masks[course.id]):
+            self.statistics['failure_causes']['instructor_window'] += 1
+        
+        print(f"SCHEDULER: Planlama -> {course.name} ({course.student_count} öğrenci, {course.exam_duration} dk)")
+        
+        # Planlanmış çakışan derslerle örtüşen başlangıçlar domain'den zaten çıkarıldı;
+        # çıkarılan değerlerin sorumluları başlangıçta çatışma kümesindedir
+        day_masks = list(self.domains[course.id])
+        
+        # Önceki programdaki (gün, başlangıç) hâlâ uygunsa ilk o denenir, sıradan taramadan çıkarılır
+        preferred_start = None
+        preferred = self.preferred_placements.get(course.id)
+        if preferred is not None and preferred[0] < len(day_masks) and (day_masks[preferred[0]] >> preferred[1]) & 1:
+            preferred_start = (preferred[0], preferred[1])
+            day_masks[preferred[0]] &= ~(1 << preferred[1])
+        
+        self.stack.append(SearchFrame(
+            course=course,
+            course_position=course_position,
+            depth=len(self.stack),
+            day_masks=day_masks,
+            conflict_set=set(self.pruned_by[course.id]),
+            remaining_mask=day_masks[0] if day_masks else 0,
+            preferred_start=preferred_start,
+            try_preferred=preferred_start is not None
+        ))
+    
+    def _next_candidate(self, frame: SearchFrame) -> Optional[Tuple[int, int]]:
+        """Çerçevenin denenmemiş ilk (gün, başlangıç) değeri; varsa önceki yer, sonra gün ve saat sırasıyla"""
+        if frame.try_preferred:
+            frame.try_preferred = False
+            return frame.preferred_start
+        while True:
+            if frame.remaining_mask:
+                lowest_bit = frame.remaining_mask & -frame.remaining_mask
+                frame.remaining_mask ^= lowest_bit
+                return frame.day_offset, lowest_bit.bit_length() - 1
+            frame.day_offset += 1
+            if frame.day_offset >= self.days:
+                return None
+            frame.remaining_mask = frame.day_masks[frame.day_offset]
+    
+    def _preferred_classrooms(self, course: Course, occupied_mask: int) -> List[Classroom]:
+        """Dersin önceki derslikleri: hepsi hâlâ sınava uygun, boş ve toplam kapasite yeterliyse"""
+        classrooms = []
+        for classroom_id in self.preferred_placements[course.id][2]:
+            classroom = self.classrooms_by_id.get(classroom_id)
+            if classroom is None or (occupied_mask >> self.scheduler.classroom_index[classroom_id]) & 1:
+                return []
+            classrooms.append(classroom)
+        if sum(cl.capacity for cl in classrooms) < course.student_count:
+            return []
+        return classrooms
+    
+    def _place(self, frame: SearchFrame, day_offset: int, start_index: int, slot_count: int,
+               selected_classrooms: List[Classroom]):
+        """Dersi yerleştir: atamalar, doluluk ızgarası ve sıralama durumu"""
+        course = frame.course
+        scheduler = self.scheduler
+        classroom_mask = 0
+        for classroom in selected_classrooms:
+            classroom_mask |= 1 << scheduler.classroom_index[classroom.id]
+        self.groups.append(ExamGroup(course.id, day_offset, start_index,
+                                     tuple(classroom.id for classroom in selected_classrooms),
+                                     str(uuid.uuid4())[:8]))
+        scheduler._mark_classrooms(day_offset, start_index, slot_count, classroom_mask)
+        
+        self.placements[course.id] = (day_offset, start_index, slot_count)
+        color = (day_offset, start_index)
+        for neighbor_id in scheduler.course_conflict_graph.get(course.id, {}):
+            colors = self.neighbor_colors.get(neighbor_id)
+            if colors is not None:
+                colors[color] = colors.get(color, 0) + 1
+        
+        self.depth_of[course.id] = frame.depth
+        self.statistics['nodes'] += 1
+        frame.placement = (day_offset, start_index, slot_count, classroom_mask)
+        frame.trail_length = len(self.domain_trail)
+        frame.pruned_by_length = len(self.pruned_by_trail)
+    
+    def _undo_placement(self, frame: SearchFrame):
+        """Çerçevenin mevcut yerleşimini tüm yan etkileriyle geri al"""
+        # En iyi kısmi atama ancak bir geri alma öncesindeki tepe noktasında olabilir
+        self._remember_best()
+        course = frame.course
+        scheduler = self.scheduler
+        day_offset, start_index, slot_count, classroom_mask = frame.placement
+        
+        while len(self.domain_trail) > frame.trail_length:
+            neighbor_id, trail_day, old_mask = self.domain_trail.pop()
+            self.domains[neighbor_id][trail_day] = old_mask
+        while len(self.pruned_by_trail) > frame.pruned_by_length:
+            neighbor_id, course_id = self.pruned_by_trail.pop()
+            self.pruned_by[neighbor_id].discard(course_id)
+        
+        del self.placements[course.id]
+        color = (day_offset, start_index)
+        for neighbor_id in scheduler.course_conflict_graph.get(course.id, {}):
+            colors = self.neighbor_colors.get(neighbor_id)
+            if colors is not None:
+                colors[color] -= 1
+                if not colors[color]:
+                    del colors[color]
+        
+        del self.depth_of[course.id]
+        self.groups.pop()
+        scheduler._release_classrooms(day_offset, start_index, slot_count, classroom_mask)
+        frame.placement = None
+    
+    def _prune_neighbor_domains(self, course: Course, day_offset: int, start_index: int, slot_count: int) -> Optional[int]:
+        """
+        Planlanmamış çakışan komşuların domain'lerinden örtüşen başlangıçları çıkar
+        Bir komşunun domain'i tamamen boşalırsa o komşunun id'sini döner (dal hemen kesilir)
+        """
+        for neighbor_id in self.scheduler.course_conflict_graph.get(course.id, {}):
+            neighbor_domain = self.domains.get(neighbor_id)
+            if neighbor_domain is None or neighbor_id in self.placements or neighbor_id in self.dropped_ids:
+                continue
+            old_mask = neighbor_domain[day_offset]
+            if not old_mask:
+                continue
+            new_mask = old_mask & ~self.scheduler._overlapping_start_mask(
+                start_index, slot_count, self.scheduler.course_slot_counts[neighbor_id]
+            )
+            if new_mask != old_mask:
+                self.domain_trail.append((neighbor_id, day_offset, old_mask))
+                neighbor_domain[day_offset] = new_mask
+                if course.id not in self.pruned_by[neighbor_id]:
+                    self.pruned_by[neighbor_id].add(course.id)
+                    self.pruned_by_trail.append((neighbor_id, course.id))
+                if not new_mask and not any(neighbor_domain):
+                    return neighbor_id
+        return None
+    
+    def _classroom_culprits(self, day_offset: int, start_index: int, slot_count: int) -> Set[int]:
+        """Aynı gün ve örtüşen aralıkta derslik tutan planlanmış dersler (derslik yetersizliğinin nedeni)"""
+        return {
+            course_id
+            for course_id, (placed_day, placed_start, placed_slot_count) in self.placements.items()
+            if placed_day == day_offset
+            and placed_start < start_index + slot_count
+            and start_index < placed_start + placed_slot_count
+        }
+    
+    def _fail_frame(self):
+        """Değerleri tükenen çerçeveyi kaldır ve çatışma kümesini bir üst seçim noktasına ilet"""
+        frame = self.stack.pop()
+        failures = self.failure_counts.get(frame.course.id, 0) + 1
+        self.failure_counts[frame.course.id] = failures
+        self.statistics['failed_courses'][frame.course.name] = failures
+        
+        conflicts = frame.conflict_set
+        budgeted = self.time_limit is not None or self.node_limit is not None
+        if self.greedy or (budgeted and (not conflicts or failures >= DROP_AFTER_FAILURES)):
+            # Başarısızlıktan hiçbir planlanmış ders sorumlu değil (tam çözüm yok), ders defalarca
+            # başarısız oldu ya da bütçe doldu: tüm yerleşimleri geri almak yerine bu ders bırakılır
+            # ve kalanlarla devam edilir, böylece en iyi kısmi atama büyümeye devam eder
+            print(f"SCHEDULER: BAŞARISIZ -> {frame.course.name} ({failures}. kez, ders programdan çıkarıldı)")
+            self.dropped_courses.append(frame.course)
+            self.dropped_ids.add(frame.course.id)
+            self._open_frame()
+            return
+        
+        self.unscheduled.insert(frame.course_position, frame.course)
+        if conflicts:
+            culprit_id = max(conflicts, key=lambda course_id: self.depth_of[course_id])
+            print(f"SCHEDULER: BAŞARISIZ -> {frame.course.name} (geri atlanacak ders id: {culprit_id})")
+        else:
+            print(f"SCHEDULER: BAŞARISIZ -> {frame.course.name} (çözümsüz, geri dönülecek ders yok)")
+        
+        if not self.stack:
+            self.status = self.FAILED
+            return
+        self._undo_placement(self.stack[-1])
+        self.statistics['backtracks'] += 1
+        self._receive_conflicts(conflicts)
+    
+    def _receive_conflicts(self, conflicts: Set[int]):
+        """
+        Yerleşimi geri alınmış tepedeki çerçeve, alt ağaçtan gelen çatışma kümesini alır
+        Çerçevenin dersi kümede yoksa başarısızlık ondan bağımsızdır: diğer değerleri
+        denenmeden yığından atılır ve en son sorumlu derse kadar geri atlanır
+        """
+        while self.stack:
+            frame = self.stack[-1]
+            if frame.course.id in conflicts:
+                frame.conflict_set |= conflicts
+                frame.conflict_set.discard(frame.course.id)
+                return
+            
+            self.statistics['backjumps'] += 1
+            self.stack.pop()
+            self.unscheduled.insert(frame.course_position, frame.course)
+            if self.stack:
+                self._undo_placement(self.stack[-1])
+                self.statistics['backtracks'] += 1
+        
+        self.status = self.FAILED
+
+
 # Eski fonksiyon ile uyumluluk için wrapper
 def generate_exam_schedule(courses: List[Course], classrooms: List[Classroom], 
-                         days: int = 7, start_date: Optional[date] = None) -> ScheduleResult:
-    """Eski API ile uyumluluk için wrapper fonksiyon"""
-    scheduler = AdvancedScheduler()
-    return scheduler.generate_exam_schedule(courses, classrooms, days, start_date)
\ No newline at end of file
+                         days: int = 7, start_date: Optional[date] = None,
+                         ordering: str = "student_count", time_limit: Optional[float] = None,
+                         node_limit: Optional[int] = None, improve_time: Optional[float] = None,
+                         seed: Optional[int] = None,
+                         fixed_assignments: Optional[List[ExamAssignment]] = None,
+                         snapshot: Optional[SchedulingSnapshot] = None,
+                         should_stop: Optional[Callable[[], bool]] = None,
+                         on_progress: Optional[Callable[[Callable[[], Dict]], None]] = None) -> ScheduleResult:
+    """
+    Eski API ile uyumluluk için wrapper fonksiyon
+    snapshot: verilirse girdiler veritabanı yerine bu kopyadan okunur
+    should_stop / on_progress: bkz. AdvancedScheduler.generate_exam_schedule
+    """
+    scheduler = AdvancedScheduler(snapshot=snapshot)
+    return scheduler.generate_exam_schedule(courses, classrooms, days, start_date, ordering,
+                                            time_limit=time_limit, node_limit=node_limit,
+                                            improve_time=improve_time, seed=seed, should_stop=should_stop,
+                                            fixed_assignments=fixed_assignments, on_progress=on_progress)
\ No newline at end of file